@@ -0,0 +1,347 @@
+import pytest
+import http.server
+import json
+import threading
+from typing import (
+    cast,
+    TYPE_CHECKING,
+)
+from urllib import parse
+
+if TYPE_CHECKING:
+    import pathlib
+
+    from typing import (
+        Any,
+        Iterator,
+        Mapping,
+        MutableSequence,
+        Optional,
+        Sequence,
+        Tuple,
+    )
+
+    from wfexs_backend.common import (
+        AbsPath,
+        SecurityContextConfig,
+        URIType,
+    )
+
+from wfexs_backend.fetchers import FetcherException
+from wfexs_backend.fetchers.http import (
+    fetchClassicURL,
+    get_pool_manager,
+    HTTP_POOL_MANAGER,
+)
+
+import urllib3
+
+CONTENT = b"0123456789" * 10
+
+
+class RecordingServer(http.server.ThreadingHTTPServer):
+    requests: "MutableSequence[Mapping[str, Any]]"
+
+
+class EndpointsHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Small set of endpoints to exercise the fetcher:
+    /content, /echo, /status/<code>, /loop, /truncated
+    and /redirect/<code>?to=<url>
+    """
+
+    protocol_version = "HTTP/1.1"
+    server: "RecordingServer"
+
+    def log_message(self, format: "str", *args: "Any") -> "None":
+        pass
+
+    def _send(
+        self,
+        code: "int",
+        body: "bytes" = b"",
+        headers: "Sequence[Tuple[str, str]]" = [],
+    ) -> "None":
+        self.send_response(code)
+        for h_key, h_val in headers:
+            self.send_header(h_key, h_val)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self) -> "None":
+        length = int(self.headers.get("Content-Length", "0"))
+        body = self.rfile.read(length) if length > 0 else b""
+        parsed = parse.urlparse(self.path)
+        self.server.requests.append(
+            {
+                "method": self.command,
+                "path": self.path,
+                # Header names are case insensitive
+                "headers": {
+                    h_key.lower(): h_val for h_key, h_val in self.headers.items()
+                },
+                "body": body.decode("utf-8"),
+            }
+        )
+
+        if parsed.path == "/content":
+            self._send(200, CONTENT)
+        elif parsed.path == "/echo":
+            self._send(200, json.dumps(self.server.requests[-1]).encode("utf-8"))
+        elif parsed.path.startswith("/status/"):
+            self._send(int(parsed.path[len("/status/") :]), b"nope")
+        elif parsed.path == "/loop":
+            self._send(302, headers=[("Location", "/loop")])
+        elif parsed.path.startswith("/redirect/"):
+            location = parse.parse_qs(parsed.query)["to"][0]
+            self._send(
+                int(parsed.path[len("/redirect/") :]),
+                headers=[("Location", location)],
+            )
+        elif parsed.path == "/truncated":
+            ranges = parse.parse_qs(parsed.query).get("ranges", ["1"])[0] == "1"
+            range_header = self.headers.get("Range")
+            if ranges and range_header is not None:
+                start = int(range_header[len("bytes=") : -1])
+                self._send(
+                    206,
+                    CONTENT[start:],
+                    headers=[
+                        (
+                            "Content-Range",
+                            f"bytes {start}-{len(CONTENT) - 1}/{len(CONTENT)}",
+                        )
+                    ],
+                )
+            else:
+                # Only the first half is sent, then the connection is closed
+                self.send_response(200)
+                if ranges:
+                    self.send_header("Accept-Ranges", "bytes")
+                self.send_header("Content-Length", str(len(CONTENT)))
+                self.end_headers()
+                self.wfile.write(CONTENT[: len(CONTENT) // 2])
+                self.wfile.flush()
+                self.close_connection = True
+        else:
+            self._send(404, b"not found")
+
+    do_GET = _handle
+    do_POST = _handle
+    do_PUT = _handle
+
+
+@pytest.fixture
+def servers() -> "Iterator[Sequence[Tuple[str, RecordingServer]]]":
+    """
+    Two servers, so redirections to a different host can be tested
+    """
+    started: "MutableSequence[Tuple[str, RecordingServer]]" = []
+    for _ in range(2):
+        server = RecordingServer(("127.0.0.1", 0), EndpointsHandler)
+        server.requests = []
+        threading.Thread(
+            target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        ).start()
+        started.append((f"http://127.0.0.1:{server.server_address[1]}", server))
+
+    yield started
+
+    for _, server in started:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def no_proxies(monkeypatch: "pytest.MonkeyPatch") -> "None":
+    for proxy_var in ("http_proxy", "https_proxy", "all_proxy", "no_proxy"):
+        monkeypatch.delenv(proxy_var, raising=False)
+        monkeypatch.delenv(proxy_var.upper(), raising=False)
+
+
+def fetch(
+    tmp_path: "pathlib.Path",
+    uri: "str",
+    secContext: "Optional[SecurityContextConfig]" = None,
+) -> "Tuple[str, bytes]":
+    cached_filename = tmp_path / "fetched"
+    fetched = fetchClassicURL(
+        cast("URIType", uri),
+        cast("AbsPath", str(cached_filename)),
+        secContext=secContext,
+    )
+    uri_with_metadata = fetched.metadata_array[0]
+    assert uri_with_metadata is not None
+
+    return uri_with_metadata.uri, cached_filename.read_bytes()
+
+
+def redirect_uri(base: "str", code: "int", to: "str") -> "str":
+    return f"{base}/redirect/{code}?" + parse.urlencode({"to": to})
+
+
+def test_fetch_content(
+    tmp_path: "pathlib.Path", servers: "Sequence[Tuple[str, RecordingServer]]"
+) -> "None":
+    base, _ = servers[0]
+    final_uri, content = fetch(tmp_path, f"{base}/content")
+
+    assert final_uri == f"{base}/content"
+    assert content == CONTENT
+
+
+@pytest.mark.parametrize("code", [301, 302, 303, 307, 308])
+def test_fetch_follows_redirections(
+    tmp_path: "pathlib.Path",
+    servers: "Sequence[Tuple[str, RecordingServer]]",
+    code: "int",
+) -> "None":
+    base, _ = servers[0]
+    other_base, _ = servers[1]
+    # A relative redirection, followed by one to other server
+    first_uri = redirect_uri(
+        base, code, "/redirect/302?" + parse.urlencode({"to": f"{other_base}/content"})
+    )
+    final_uri, content = fetch(tmp_path, first_uri)
+
+    assert final_uri == f"{other_base}/content"
+    assert content == CONTENT
+
+
+@pytest.mark.parametrize(
+    "code,method,has_body",
+    [
+        (301, "GET", False),
+        (302, "GET", False),
+        (303, "GET", False),
+        (307, "POST", True),
+        (308, "POST", True),
+    ],
+)
+def test_fetch_redirection_method_rewrite(
+    tmp_path: "pathlib.Path",
+    servers: "Sequence[Tuple[str, RecordingServer]]",
+    code: "int",
+    method: "str",
+    has_body: "bool",
+) -> "None":
+    base, _ = servers[0]
+    _, content = fetch(
+        tmp_path,
+        redirect_uri(base, code, "/echo"),
+        secContext={"method": "POST", "data": b"payload"},
+    )
+    echoed = json.loads(content)
+
+    assert echoed["method"] == method
+    assert echoed["body"] == ("payload" if has_body else "")
+
+
+@pytest.mark.parametrize(
+    "secContext,credential_header",
+    [
+        ({"token": "secret"}, "authorization"),
+        ({"token": "secret", "token_header": "X-Auth-Token"}, "x-auth-token"),
+        ({"username": "user", "password": "secret"}, "authorization"),
+    ],
+)
+def test_fetch_credentials_stay_in_the_same_server(
+    tmp_path: "pathlib.Path",
+    servers: "Sequence[Tuple[str, RecordingServer]]",
+    secContext: "SecurityContextConfig",
+    credential_header: "str",
+) -> "None":
+    base, _ = servers[0]
+    other_base, _ = servers[1]
+    secContext = {**secContext, "headers": {"X-Other": "kept"}}
+
+    # Same server redirections keep the credentials
+    _, content = fetch(tmp_path, redirect_uri(base, 302, "/echo"), secContext)
+    echoed_headers = json.loads(content)["headers"]
+    assert credential_header in echoed_headers
+    assert echoed_headers["x-other"] == "kept"
+
+    # but they are not handed to other servers
+    _, content = fetch(
+        tmp_path, redirect_uri(base, 302, f"{other_base}/echo"), secContext
+    )
+    echoed_headers = json.loads(content)["headers"]
+    assert credential_header not in echoed_headers
+    assert "authorization" not in echoed_headers
+    assert echoed_headers["x-other"] == "kept"
+
+
+@pytest.mark.parametrize("code", [400, 403, 404, 500])
+def test_fetch_error_status(
+    tmp_path: "pathlib.Path",
+    servers: "Sequence[Tuple[str, RecordingServer]]",
+    code: "int",
+) -> "None":
+    base, _ = servers[0]
+    with pytest.raises(FetcherException) as fe:
+        fetch(tmp_path, f"{base}/status/{code}")
+
+    assert fe.value.code == code
+    # No partial download is left behind
+    assert not (tmp_path / "fetched").exists()
+
+
+def test_fetch_too_many_redirections(
+    tmp_path: "pathlib.Path", servers: "Sequence[Tuple[str, RecordingServer]]"
+) -> "None":
+    base, _ = servers[0]
+    with pytest.raises(FetcherException, match="too many redirections"):
+        fetch(tmp_path, f"{base}/loop")
+
+
+def test_fetch_resumes_broken_transfers(
+    tmp_path: "pathlib.Path", servers: "Sequence[Tuple[str, RecordingServer]]"
+) -> "None":
+    base, server = servers[0]
+    _, content = fetch(tmp_path, f"{base}/truncated")
+
+    assert content == CONTENT
+    assert server.requests[-1]["headers"]["range"] == f"bytes={len(CONTENT) // 2}-"
+
+
+def test_fetch_broken_transfer_without_ranges(
+    tmp_path: "pathlib.Path", servers: "Sequence[Tuple[str, RecordingServer]]"
+) -> "None":
+    base, _ = servers[0]
+    with pytest.raises(FetcherException):
+        fetch(tmp_path, f"{base}/truncated?ranges=0")
+
+    assert not (tmp_path / "fetched").exists()
+
+
+def test_get_pool_manager_honours_proxies(
+    monkeypatch: "pytest.MonkeyPatch",
+) -> "None":
+    assert get_pool_manager("http://example.org/") is HTTP_POOL_MANAGER
+
+    monkeypatch.setenv("http_proxy", "http://proxy.example.org:3128")
+    monkeypatch.setenv("no_proxy", "bypassed.example.org")
+    proxy_manager = get_pool_manager("http://example.org/")
+    assert isinstance(proxy_manager, urllib3.ProxyManager)
+    # Managers are shared
+    assert get_pool_manager("http://example.org/other") is proxy_manager
+    assert get_pool_manager("http://bypassed.example.org/") is HTTP_POOL_MANAGER
+    # Only the proxies for the scheme are used
+    assert get_pool_manager("https://example.org/") is HTTP_POOL_MANAGER
+
+
+def test_fetch_through_proxy(
+    tmp_path: "pathlib.Path",
+    servers: "Sequence[Tuple[str, RecordingServer]]",
+    monkeypatch: "pytest.MonkeyPatch",
+) -> "None":
+    base, server = servers[0]
+    monkeypatch.setenv("http_proxy", base)
+
+    final_uri, content = fetch(tmp_path, "http://wfexs.invalid/content")
+
+    assert final_uri == "http://wfexs.invalid/content"
+    assert content == CONTENT
+    # The proxy receives the absolute URL
+    assert server.requests[-1]["path"] == "http://wfexs.invalid/content"
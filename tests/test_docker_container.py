@@ -0,0 +1,240 @@
+import pytest
+import json
+import os
+import subprocess
+import sys
+from typing import (
+    cast,
+    TYPE_CHECKING,
+)
+
+if TYPE_CHECKING:
+    import pathlib
+
+    from typing import (
+        Sequence,
+    )
+
+    from wfexs_backend.common import (
+        AbsPath,
+        ContainerLocalConfig,
+        RelPath,
+        URIType,
+    )
+
+from wfexs_backend.common import (
+    ContainerTaggedName,
+    ContainerType,
+    META_JSON_POSTFIX,
+)
+from wfexs_backend.docker_container import DockerContainerFactory
+
+# A minimal docker command line replacement, which keeps the
+# images it knows about in a JSON file, and logs its invocations
+FAKE_DOCKER = """#!{python}
+import gzip
+import hashlib
+import json
+import sys
+import time
+
+STATE = {state!r}
+LOG = {log!r}
+SAVE_DELAY = {save_delay!r}
+
+def manifest(tag, image_id):
+    return {{
+        "Id": image_id,
+        "RepoTags": [tag],
+        "RepoDigests": [tag.split(":")[0] + "@" + image_id],
+        "Architecture": "amd64",
+        "Os": "linux",
+    }}
+
+try:
+    with open(STATE) as sH:
+        images = json.load(sH)
+except FileNotFoundError:
+    images = {{}}
+
+command, args = sys.argv[1], sys.argv[2:]
+with open(LOG, "a") as lH:
+    print(command, *args, file=lH)
+
+retval = 0
+if command == "pull":
+    images[args[0]] = manifest(
+        args[0], "sha256:" + hashlib.sha256(args[0].encode()).hexdigest()
+    )
+elif command == "inspect":
+    found = [images[tag] for tag in args if tag in images]
+    print(json.dumps(found))
+    if len(found) != len(args):
+        retval = 125
+elif command == "save":
+    time.sleep(SAVE_DELAY)
+    json.dump({{args[0]: images[args[0]]}}, sys.stdout)
+    with open(LOG, "a") as lH:
+        print("saved", *args, file=lH)
+elif command == "load":
+    # As docker does, compressed archives are accepted
+    archive = sys.stdin.buffer.read()
+    if archive.startswith(b"\\x1f\\x8b"):
+        archive = gzip.decompress(archive)
+    images.update(json.loads(archive))
+elif command == "rmi":
+    retval = 0 if images.pop(args[0], None) is not None else 1
+elif command == "retag":
+    images[args[0]] = manifest(args[0], args[1])
+else:
+    retval = 1
+
+with open(STATE, "w") as sH:
+    json.dump(images, sH)
+
+sys.exit(retval)
+"""
+
+
+class FakeDocker:
+    def __init__(self, tmp_path: "pathlib.Path", save_delay: "float" = 0.0):
+        self.log_path = tmp_path / "fake_docker.log"
+        self.command = tmp_path / "docker"
+        self.command.write_text(
+            FAKE_DOCKER.format(
+                python=sys.executable,
+                save_delay=save_delay,
+                state=str(tmp_path / "fake_docker.json"),
+                log=str(self.log_path),
+            )
+        )
+        self.command.chmod(0o755)
+
+    def __call__(self, *args: "str") -> "None":
+        subprocess.run([str(self.command), *args], check=True)
+
+    def commands(self) -> "Sequence[str]":
+        if not self.log_path.exists():
+            return []
+        return [line.split()[0] for line in self.log_path.read_text().splitlines()]
+
+    def clear_log(self) -> "None":
+        if self.log_path.exists():
+            self.log_path.unlink()
+
+
+@pytest.fixture(autouse=True)
+def empty_manifests_cache() -> "None":
+    # The cache is shared within the process, so each test starts afresh
+    with DockerContainerFactory._MANIFESTS_CACHE_LOCK:
+        DockerContainerFactory._MANIFESTS_CACHE.clear()
+
+
+def simple_file_name(uri: "URIType") -> "RelPath":
+    return cast("RelPath", uri.replace("/", "_").replace(":", "_"))
+
+
+def new_factory(
+    tmp_path: "pathlib.Path", fake_docker: "FakeDocker", engine_name: "str" = "engine"
+) -> "DockerContainerFactory":
+    local_config: "ContainerLocalConfig" = {
+        "tools": {
+            "dockerCommand": str(fake_docker.command),
+        },
+    }
+    return DockerContainerFactory(
+        cacheDir=cast("AbsPath", str(tmp_path / "cache")),
+        stagedContainersDir=cast("AbsPath", str(tmp_path / "staged")),
+        local_config=local_config,
+        engine_name=engine_name,
+        tempDir=cast("AbsPath", str(tmp_path / "tmp")),
+    )
+
+
+TAG = ContainerTaggedName(
+    origTaggedName="quay.io/example/tool:1.0",
+    type=ContainerType.Docker,
+)
+
+
+@pytest.mark.parametrize(
+    "change_image",
+    [
+        ["rmi", TAG.origTaggedName],
+        ["retag", TAG.origTaggedName, "sha256:" + "0" * 64],
+    ],
+)
+def test_deploy_notices_external_image_changes(
+    tmp_path: "pathlib.Path", change_image: "Sequence[str]"
+) -> "None":
+    fake_docker = FakeDocker(tmp_path)
+    factory = new_factory(tmp_path, fake_docker)
+
+    containers = factory.materializeContainers([TAG], simple_file_name)
+    assert len(containers) == 1
+
+    # The pulled image is the one which was saved
+    assert factory.deployContainers(containers, simple_file_name) == []
+
+    # Other process removes or replaces the image
+    fake_docker(*change_image)
+    fake_docker.clear_log()
+
+    assert factory.deployContainers(containers, simple_file_name) == containers
+    assert fake_docker.commands() == ["inspect", "load"]
+
+    # Once loaded, the image is not loaded again
+    fake_docker.clear_log()
+    assert factory.deployContainers(containers, simple_file_name) == []
+    assert fake_docker.commands() == ["inspect"]
+
+
+def test_materialize_reuses_image_saved_by_other_engine(
+    tmp_path: "pathlib.Path",
+) -> "None":
+    fake_docker = FakeDocker(tmp_path)
+    first_containers = new_factory(
+        tmp_path, fake_docker, engine_name="first"
+    ).materializeContainers([TAG], simple_file_name)
+    assert fake_docker.commands() == ["pull", "inspect", "save", "saved"]
+
+    fake_docker.clear_log()
+    second_factory = new_factory(tmp_path, fake_docker, engine_name="second")
+    second_containers = second_factory.materializeContainers([TAG], simple_file_name)
+
+    # Neither pulled nor saved again
+    assert fake_docker.commands() == []
+    assert second_containers[0].signature == first_containers[0].signature
+    assert second_containers[0].image_signature == first_containers[0].image_signature
+    local_meta = os.path.join(
+        second_factory.engineContainersSymlinkDir,
+        simple_file_name(cast("URIType", TAG.origTaggedName)) + META_JSON_POSTFIX,
+    )
+    assert os.path.islink(local_meta)
+    with open(local_meta, mode="r", encoding="utf-8") as mH:
+        assert json.load(mH)["image_id"] == first_containers[0].signature
+
+
+def test_materialize_saves_different_images_concurrently(
+    tmp_path: "pathlib.Path",
+) -> "None":
+    fake_docker = FakeDocker(tmp_path, save_delay=0.5)
+    tags = [
+        ContainerTaggedName(
+            origTaggedName=f"quay.io/example/tool{i_tag}:1.0",
+            type=ContainerType.Docker,
+        )
+        for i_tag in range(2)
+    ]
+    containers = new_factory(tmp_path, fake_docker).materializeContainers(
+        tags, simple_file_name
+    )
+
+    assert [container.origTaggedName for container in containers] == [
+        tag.origTaggedName for tag in tags
+    ]
+    # Both saves were running at the same time
+    save_commands = [
+        command for command in fake_docker.commands() if command.startswith("save")
+    ]
+    assert save_commands == ["save", "save", "saved", "saved"]
@@ -0,0 +1,164 @@
+import pytest
+import threading
+import time
+from typing import (
+    cast,
+    TYPE_CHECKING,
+)
+
+if TYPE_CHECKING:
+    from typing import (
+        Any,
+        MutableMapping,
+        MutableSequence,
+        Sequence,
+        Set,
+        Tuple,
+        Union,
+    )
+
+    from wfexs_backend.common import (
+        URIType,
+    )
+
+from wfexs_backend.common import (
+    CacheType,
+    LicensedURI,
+)
+from wfexs_backend.wfexs_backend import WfExSBackend
+
+
+class FakeDownloadError(Exception):
+    pass
+
+
+def fake_backend(
+    calls: "MutableSequence[Tuple[str, str]]",
+) -> "WfExSBackend":
+    """
+    It returns a backend which is not initialized, whose downloadContent
+    records which thread fetched each URI, answering with the URI itself
+    """
+    wfBackend = WfExSBackend.__new__(WfExSBackend)
+
+    def downloadContent(
+        remote_file: "Union[LicensedURI, Sequence[LicensedURI]]", **kwargs: "Any"
+    ) -> "str":
+        assert isinstance(remote_file, (LicensedURI, list))
+        the_uri = (
+            remote_file.uri
+            if isinstance(remote_file, LicensedURI)
+            else remote_file[0].uri
+        )
+        # Giving the chance to other threads to run
+        time.sleep(0.01)
+        calls.append((the_uri, threading.current_thread().name))
+        if the_uri.endswith("/fail"):
+            raise FakeDownloadError(the_uri)
+        return the_uri
+
+    setattr(wfBackend, "downloadContent", downloadContent)
+
+    return wfBackend
+
+
+def licensed(uri: "str") -> "LicensedURI":
+    return LicensedURI(uri=cast("URIType", uri))
+
+
+def test_download_contents_keeps_order() -> "None":
+    calls: "MutableSequence[Tuple[str, str]]" = []
+    uris = [
+        "https://a.example.org/1",
+        "https://b.example.org/1",
+        "https://a.example.org/2",
+        "ftp://a.example.org/3",
+        "https://c.example.org/1",
+    ]
+    mat_contents = fake_backend(calls).downloadContents(
+        [licensed(uri) for uri in uris], dest=CacheType.Input
+    )
+
+    assert list(cast("Sequence[str]", mat_contents)) == uris
+
+
+def test_download_contents_groups_by_host() -> "None":
+    calls: "MutableSequence[Tuple[str, str]]" = []
+    uris = [
+        "https://a.example.org/1",
+        "https://b.example.org/1",
+        "https://a.example.org/2",
+        "http://a.example.org/3",
+        "https://a.example.org/4",
+    ]
+    fake_backend(calls).downloadContents(
+        [licensed(uri) for uri in uris], dest=CacheType.Input
+    )
+
+    threads_by_host: "MutableMapping[str, Set[str]]" = {}
+    for the_uri, thread_name in calls:
+        host = the_uri[: the_uri.rindex("/")]
+        threads_by_host.setdefault(host, set()).add(thread_name)
+
+    # Each (scheme, host) pair is fetched from a single thread
+    assert all(len(thread_names) == 1 for thread_names in threads_by_host.values())
+    assert len(set.union(*threads_by_host.values())) == 3
+
+    # and sequentially, following the input order
+    assert [the_uri for the_uri, _ in calls if the_uri.startswith("https://a.")] == [
+        "https://a.example.org/1",
+        "https://a.example.org/2",
+        "https://a.example.org/4",
+    ]
+
+
+def test_download_contents_single_host_runs_inline() -> "None":
+    calls: "MutableSequence[Tuple[str, str]]" = []
+    fake_backend(calls).downloadContents(
+        [licensed("https://a.example.org/1"), licensed("https://a.example.org/2")],
+        dest=CacheType.Input,
+    )
+
+    assert {thread_name for _, thread_name in calls} == {
+        threading.current_thread().name
+    }
+
+
+@pytest.mark.parametrize(
+    "alternates",
+    [
+        [licensed("https://b.example.org/1"), licensed("https://a.example.org/1")],
+        (licensed("https://b.example.org/1"), licensed("https://a.example.org/1")),
+    ],
+)
+def test_download_contents_groups_alternates_by_first_uri(
+    alternates: "Sequence[LicensedURI]",
+) -> "None":
+    calls: "MutableSequence[Tuple[str, str]]" = []
+    mat_contents = fake_backend(calls).downloadContents(
+        [licensed("https://b.example.org/2"), alternates], dest=CacheType.Input
+    )
+
+    assert list(cast("Sequence[str]", mat_contents)) == [
+        "https://b.example.org/2",
+        "https://b.example.org/1",
+    ]
+    # Both belong to the same host, so no thread is involved
+    assert {thread_name for _, thread_name in calls} == {
+        threading.current_thread().name
+    }
+
+
+@pytest.mark.parametrize(
+    "uris",
+    [
+        ["https://a.example.org/fail"],
+        ["https://a.example.org/1", "https://b.example.org/fail"],
+    ],
+)
+def test_download_contents_propagates_errors(uris: "Sequence[str]") -> "None":
+    calls: "MutableSequence[Tuple[str, str]]" = []
+    with pytest.raises(FakeDownloadError):
+        fake_backend(calls).downloadContents(
+            [licensed(uri) for uri in uris], dest=CacheType.Input
+        )
@@ -0,0 +1,98 @@
+import pytest
+from typing import (
+    cast,
+    TYPE_CHECKING,
+)
+
+if TYPE_CHECKING:
+    import pathlib
+
+    from typing import (
+        Optional,
+        Sequence,
+    )
+
+    from wfexs_backend.common import (
+        AbsPath,
+        RelPath,
+    )
+
+from wfexs_backend.common import (
+    LocalWorkflow,
+)
+from wfexs_backend.cwl_engine import CWLWorkflowEngine
+from wfexs_backend.nextflow_engine import NextflowWorkflowEngine
+from wfexs_backend.workflow import WF
+
+
+def probing_order(
+    wf_dir: "pathlib.Path", relPath: "Optional[str]" = None
+) -> "Sequence[type]":
+    """
+    It returns the engine classes in the order _engineProbingOrder
+    would try them, using a non initialized WF instance
+    """
+    wf = WF.__new__(WF)
+    localWorkflow = LocalWorkflow(
+        dir=cast("AbsPath", str(wf_dir)),
+        relPath=cast("Optional[RelPath]", relPath),
+        effectiveCheckout=None,
+    )
+
+    return [engineDesc.clazz for engineDesc in wf._engineProbingOrder(localWorkflow)]
+
+
+def declared_order() -> "Sequence[type]":
+    return [engineDesc.clazz for engineDesc in WF.WORKFLOW_ENGINES]
+
+
+@pytest.mark.parametrize(
+    "filenames,relPath,first_engine",
+    [
+        (["main.nf", "nextflow.config"], None, NextflowWorkflowEngine),
+        (["modules.nf", "README.md"], None, NextflowWorkflowEngine),
+        (["workflow.cwl", "tool.cwl", "README.md"], None, CWLWorkflowEngine),
+        (["workflow.cwl", "main.nf"], "main.nf", NextflowWorkflowEngine),
+        (["workflow.cwl", "main.nf"], "workflow.cwl", CWLWorkflowEngine),
+    ],
+)
+def test_engine_probing_order_follows_hints(
+    tmp_path: "pathlib.Path",
+    filenames: "Sequence[str]",
+    relPath: "Optional[str]",
+    first_engine: "type",
+) -> "None":
+    for filename in filenames:
+        (tmp_path / filename).touch()
+
+    order = probing_order(tmp_path, relPath)
+
+    assert order[0] == first_engine
+    # No engine is lost or duplicated
+    assert sorted(order, key=id) == sorted(declared_order(), key=id)
+
+
+@pytest.mark.parametrize(
+    "filenames",
+    [
+        [],
+        ["README.md", "Snakefile"],
+        # Ties keep the declared order
+        ["workflow.cwl", "main.nf"],
+    ],
+)
+def test_engine_probing_order_falls_back_to_declared_order(
+    tmp_path: "pathlib.Path",
+    filenames: "Sequence[str]",
+) -> "None":
+    for filename in filenames:
+        (tmp_path / filename).touch()
+
+    assert probing_order(tmp_path) == declared_order()
+
+
+def test_engine_probing_order_with_missing_path(tmp_path: "pathlib.Path") -> "None":
+    assert probing_order(tmp_path, "subdir/main.cwl") == [
+        CWLWorkflowEngine,
+        *(clazz for clazz in declared_order() if clazz != CWLWorkflowEngine),
+    ]
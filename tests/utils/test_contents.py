@@ -0,0 +1,129 @@
+import pytest
+import atexit
+import os
+import signal
+import threading
+from typing import (
+    TYPE_CHECKING,
+)
+
+if TYPE_CHECKING:
+    import pathlib
+
+    from typing import (
+        MutableSequence,
+        Optional,
+    )
+
+from wfexs_backend.utils import contents
+from wfexs_backend.utils.contents import parallel_rmtree
+
+
+def populate_tree(root: "pathlib.Path", width: "int" = 4, depth: "int" = 3) -> "None":
+    """
+    It creates a tree of nested directories, with a file at every level
+    """
+    root.mkdir(parents=True, exist_ok=True)
+    (root / "file.txt").write_text("content")
+    if depth > 0:
+        for i_child in range(width):
+            populate_tree(root / f"dir_{i_child}", width=width, depth=depth - 1)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2, 8])
+def test_parallel_rmtree_removes_nested_dirs(
+    tmp_path: "pathlib.Path", max_workers: "int"
+) -> "None":
+    outside = tmp_path / "outside.txt"
+    outside.write_text("keep me")
+    root = tmp_path / "tree"
+    populate_tree(root)
+    (root / "dir_0" / "link").symlink_to(outside)
+    (root / "top_link").symlink_to(outside)
+
+    parallel_rmtree(str(root), max_workers=max_workers)
+
+    assert not root.exists()
+    # Symlinks are removed, not followed
+    assert outside.read_text() == "keep me"
+
+
+def test_parallel_rmtree_on_missing_dir(tmp_path: "pathlib.Path") -> "None":
+    parallel_rmtree(str(tmp_path / "missing"))
+
+    assert not (tmp_path / "missing").exists()
+
+
+def test_parallel_rmtree_error_does_not_abort_others(
+    tmp_path: "pathlib.Path", monkeypatch: "pytest.MonkeyPatch"
+) -> "None":
+    root = tmp_path / "tree"
+    populate_tree(root, width=6, depth=2)
+    bad_child = str(root / "dir_0")
+
+    orig_remove_path = contents._remove_path
+    attempted: "MutableSequence[str]" = []
+    attempted_lock = threading.Lock()
+
+    def failing_remove_path(the_path: "str") -> "None":
+        with attempted_lock:
+            attempted.append(the_path)
+        if the_path == bad_child:
+            raise OSError(f"Simulated failure removing {the_path}")
+        orig_remove_path(the_path)
+
+    monkeypatch.setattr(contents, "_remove_path", failing_remove_path)
+
+    parallel_rmtree(str(root), max_workers=2)
+
+    # Every top level entry was handled by the workers
+    assert sorted(attempted) == sorted(
+        [str(root / f"dir_{i_child}") for i_child in range(6)]
+        + [str(root / "file.txt")]
+    )
+    # and the failing one was removed by the final serial pass
+    assert not root.exists()
+
+
+@pytest.mark.parametrize("keep_tmp", [None, "0", "1"])
+def test_cleanup_tempdirs_honours_keep_tmp(
+    tmp_path: "pathlib.Path",
+    monkeypatch: "pytest.MonkeyPatch",
+    keep_tmp: "Optional[str]",
+) -> "None":
+    tempdirs = [tmp_path / "first", tmp_path / "second"]
+    for tempdir in tempdirs:
+        populate_tree(tempdir, width=2, depth=2)
+
+    # The registry is isolated, so no atexit hook is involved
+    monkeypatch.setattr(contents, "_TEMP_DIRS_TO_CLEAN", [str(t) for t in tempdirs])
+    if keep_tmp is None:
+        monkeypatch.delenv("WFEXS_KEEP_TMP", raising=False)
+    else:
+        monkeypatch.setenv("WFEXS_KEEP_TMP", keep_tmp)
+
+    contents._cleanup_tempdirs()
+
+    if keep_tmp == "1":
+        assert all(os.path.isdir(tempdir) for tempdir in tempdirs)
+        assert len(contents._TEMP_DIRS_TO_CLEAN) == 2
+    else:
+        assert not any(os.path.exists(tempdir) for tempdir in tempdirs)
+        assert len(contents._TEMP_DIRS_TO_CLEAN) == 0
+
+
+def test_register_tempdir_cleanup_installs_hook_once(
+    tmp_path: "pathlib.Path", monkeypatch: "pytest.MonkeyPatch"
+) -> "None":
+    registered: "MutableSequence[object]" = []
+    monkeypatch.setattr(atexit, "register", registered.append)
+    monkeypatch.setattr(signal, "signal", lambda *args: None)
+    monkeypatch.setattr(contents, "_TEMP_DIRS_TO_CLEAN", [])
+    monkeypatch.setattr(contents, "_TEMP_DIRS_CLEANUP_INSTALLED", False)
+
+    tempdirs = [str(tmp_path / "first"), str(tmp_path / "second")]
+    for tempdir in tempdirs:
+        contents.register_tempdir_cleanup(tempdir)
+
+    assert registered == [contents._cleanup_tempdirs]
+    assert contents._TEMP_DIRS_TO_CLEAN == tempdirs
@@ -81,6 +81,7 @@ from .security_context import SecurityContextVault
 from .wfexs_backend import WfExSBackend
 from .workflow import WF
 from . import get_WfExS_version_str
+from .utils.contents import register_tempdir_cleanup
 from .utils.misc import DatetimeEncoder
 
 
@@ -1131,7 +1132,7 @@ def main() -> None:
         cacheDir = tempfile.mkdtemp(prefix="wfexs", suffix="tmpcache")
         local_config["cacheDir"] = cacheDir
         # Assuring this temporal directory is removed at the end
-        atexit.register(shutil.rmtree, cacheDir)
+        register_tempdir_cleanup(cacheDir)
         print(
             f"[WARNING] Cache directory not defined. Created a temporary one at {cacheDir}",
             file=sys.stderr,
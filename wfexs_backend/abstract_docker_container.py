@@ -154,108 +154,114 @@ class AbstractDockerContainerFactory(ContainerFactory):
         pass
 
     def _images(self, matEnv: "Mapping[str, str]") -> "Tuple[ExitVal, str, str]":
-        with tempfile.NamedTemporaryFile() as d_out, tempfile.NamedTemporaryFile() as d_err:
-            self.logger.debug(f"querying available {self.variant_name()} containers")
-            d_retval = subprocess.Popen(
-                [self.runtime_cmd, "images"],
-                env=matEnv,
-                stdout=d_out,
-                stderr=d_err,
-            ).wait()
+        self.logger.debug(f"querying available {self.variant_name()} containers")
+        d_proc = subprocess.run(
+            [self.runtime_cmd, "images"],
+            env=matEnv,
+            capture_output=True,
+        )
+        d_retval = d_proc.returncode
 
-            self.logger.debug(f"{self.variant_name()} images retval: {d_retval}")
+        self.logger.debug(f"{self.variant_name()} images retval: {d_retval}")
 
-            with open(d_out.name, mode="rb") as c_stF:
-                d_out_v = c_stF.read().decode("utf-8", errors="continue")
-            with open(d_err.name, mode="rb") as c_stF:
-                d_err_v = c_stF.read().decode("utf-8", errors="continue")
+        d_out_v = d_proc.stdout.decode("utf-8", errors="replace")
+        d_err_v = d_proc.stderr.decode("utf-8", errors="replace")
 
-            self.logger.debug(f"{self.variant_name()} inspect stdout: {d_out_v}")
+        self.logger.debug(f"{self.variant_name()} images stdout: {d_out_v}")
 
-            self.logger.debug(f"{self.variant_name()} inspect stderr: {d_err_v}")
+        self.logger.debug(f"{self.variant_name()} images stderr: {d_err_v}")
 
-            return cast("ExitVal", d_retval), d_out_v, d_err_v
+        return cast("ExitVal", d_retval), d_out_v, d_err_v
 
     def _inspect(
-        self, dockerTag: "str", matEnv: "Mapping[str, str]"
+        self, dockerTag: "Union[str, Sequence[str]]", matEnv: "Mapping[str, str]"
     ) -> "Tuple[ExitVal, str, str]":
-        with tempfile.NamedTemporaryFile() as d_out, tempfile.NamedTemporaryFile() as d_err:
-            self.logger.debug(f"querying {self.variant_name()} container {dockerTag}")
-            d_retval = subprocess.Popen(
-                [self.runtime_cmd, "inspect", dockerTag],
-                env=matEnv,
-                stdout=d_out,
-                stderr=d_err,
-            ).wait()
-
-            self.logger.debug(
-                f"{self.variant_name()} inspect {dockerTag} retval: {d_retval}"
-            )
+        """
+        Several tags can be inspected at once. The answer is a JSON
+        array following the order of the tags, provided all of them exist
+        """
+        dockerTags = [dockerTag] if isinstance(dockerTag, str) else list(dockerTag)
+        if not isinstance(dockerTag, str):
+            dockerTag = " ".join(dockerTags)
+        self.logger.debug(f"querying {self.variant_name()} container {dockerTag}")
+        d_proc = subprocess.run(
+            [self.runtime_cmd, "inspect", *dockerTags],
+            env=matEnv,
+            capture_output=True,
+        )
+        d_retval = d_proc.returncode
 
-            with open(d_out.name, mode="rb") as c_stF:
-                d_out_v = c_stF.read().decode("utf-8", errors="continue")
-            with open(d_err.name, mode="rb") as c_stF:
-                d_err_v = c_stF.read().decode("utf-8", errors="continue")
+        self.logger.debug(
+            f"{self.variant_name()} inspect {dockerTag} retval: {d_retval}"
+        )
 
-            self.logger.debug(f"{self.variant_name()} inspect stdout: {d_out_v}")
+        d_out_v = d_proc.stdout.decode("utf-8", errors="replace")
+        self.logger.debug(f"{self.variant_name()} inspect stdout: {d_out_v}")
 
+        # Only stdout is needed on success
+        if d_retval != 0 or self.logger.isEnabledFor(logging.DEBUG):
+            d_err_v = d_proc.stderr.decode("utf-8", errors="replace")
             self.logger.debug(f"{self.variant_name()} inspect stderr: {d_err_v}")
+        else:
+            d_err_v = ""
 
-            return cast("ExitVal", d_retval), d_out_v, d_err_v
+        return cast("ExitVal", d_retval), d_out_v, d_err_v
 
     def _pull(
         self, dockerTag: "str", matEnv: "Mapping[str, str]"
     ) -> "Tuple[ExitVal, str, str]":
-        with tempfile.NamedTemporaryFile() as d_out, tempfile.NamedTemporaryFile() as d_err:
-            self.logger.debug(f"pulling {self.variant_name()} container {dockerTag}")
-            d_retval = subprocess.Popen(
-                [self.runtime_cmd, "pull", dockerTag],
-                env=matEnv,
-                stdout=d_out,
-                stderr=d_err,
-            ).wait()
+        self.logger.debug(f"pulling {self.variant_name()} container {dockerTag}")
+        d_proc = subprocess.run(
+            [self.runtime_cmd, "pull", dockerTag],
+            env=matEnv,
+            capture_output=True,
+        )
+        d_retval = d_proc.returncode
 
-            self.logger.debug(
-                f"{self.variant_name()} pull {dockerTag} retval: {d_retval}"
-            )
+        self.logger.debug(f"{self.variant_name()} pull {dockerTag} retval: {d_retval}")
 
-            with open(d_out.name, mode="r") as c_stF:
-                d_out_v = c_stF.read()
-            with open(d_err.name, "r") as c_stF:
-                d_err_v = c_stF.read()
+        # The (sometimes huge) output is only decoded when it is going
+        # to be used, as callers only look at it on failure
+        if d_retval != 0 or self.logger.isEnabledFor(logging.DEBUG):
+            d_out_v = d_proc.stdout.decode("utf-8", errors="replace")
+            d_err_v = d_proc.stderr.decode("utf-8", errors="replace")
 
             self.logger.debug(f"{self.variant_name()} pull stdout: {d_out_v}")
 
             self.logger.debug(f"{self.variant_name()} pull stderr: {d_err_v}")
+        else:
+            d_out_v = ""
+            d_err_v = ""
 
-            return cast("ExitVal", d_retval), d_out_v, d_err_v
+        return cast("ExitVal", d_retval), d_out_v, d_err_v
 
     def _rmi(
         self, dockerTag: "str", matEnv: "Mapping[str, str]"
     ) -> "Tuple[ExitVal, str, str]":
-        with tempfile.NamedTemporaryFile() as d_out, tempfile.NamedTemporaryFile() as d_err:
-            self.logger.debug(f"removing {self.variant_name()} container {dockerTag}")
-            d_retval = subprocess.Popen(
-                [self.runtime_cmd, "rmi", dockerTag],
-                env=matEnv,
-                stdout=d_out,
-                stderr=d_err,
-            ).wait()
+        self.logger.debug(f"removing {self.variant_name()} container {dockerTag}")
+        d_proc = subprocess.run(
+            [self.runtime_cmd, "rmi", dockerTag],
+            env=matEnv,
+            capture_output=True,
+        )
+        d_retval = d_proc.returncode
 
-            self.logger.debug(
-                f"{self.variant_name()} rmi {dockerTag} retval: {d_retval}"
-            )
+        self.logger.debug(f"{self.variant_name()} rmi {dockerTag} retval: {d_retval}")
 
-            with open(d_out.name, mode="r") as c_stF:
-                d_out_v = c_stF.read()
-            with open(d_err.name, "r") as c_stF:
-                d_err_v = c_stF.read()
+        # The (sometimes huge) output is only decoded when it is going
+        # to be used, as callers only look at it on failure
+        if d_retval != 0 or self.logger.isEnabledFor(logging.DEBUG):
+            d_out_v = d_proc.stdout.decode("utf-8", errors="replace")
+            d_err_v = d_proc.stderr.decode("utf-8", errors="replace")
 
             self.logger.debug(f"{self.variant_name()} rmi stdout: {d_out_v}")
 
             self.logger.debug(f"{self.variant_name()} rmi stderr: {d_err_v}")
+        else:
+            d_out_v = ""
+            d_err_v = ""
 
-            return cast("ExitVal", d_retval), d_out_v, d_err_v
+        return cast("ExitVal", d_retval), d_out_v, d_err_v
 
     def _load(
         self,
@@ -291,13 +297,13 @@ class AbstractDockerContainerFactory(ContainerFactory):
                 f"{self.variant_name()} load {dockerTag} retval: {d_retval}"
             )
 
-            with open(d_out.name, "r") as c_stF:
-                d_out_v = c_stF.read()
+            d_out.seek(0)
+            d_out_v = d_out.read().decode("utf-8", errors="replace")
 
             self.logger.debug(f"{self.variant_name()} load stdout: {d_out_v}")
 
-            with open(d_err.name, "r") as c_stF:
-                d_err_v = c_stF.read()
+            d_err.seek(0)
+            d_err_v = d_err.read().decode("utf-8", errors="replace")
 
             self.logger.debug(f"{self.variant_name()} load stderr: {d_err_v}")
 
@@ -329,8 +335,8 @@ class AbstractDockerContainerFactory(ContainerFactory):
                 f"{self.variant_name()} save {dockerTag} retval: {d_retval}"
             )
 
-            with open(d_err.name, "r") as c_stF:
-                d_err_v = c_stF.read()
+            d_err.seek(0)
+            d_err_v = d_err.read().decode("utf-8", errors="replace")
 
             self.logger.debug(f"{self.variant_name()} save stderr: {d_err_v}")
 
@@ -339,23 +345,20 @@ class AbstractDockerContainerFactory(ContainerFactory):
     def _version(
         self,
     ) -> "Tuple[ExitVal, str, str]":
-        with tempfile.NamedTemporaryFile() as d_out, tempfile.NamedTemporaryFile() as d_err:
-            self.logger.debug(f"querying {self.variant_name()} version and details")
-            d_retval = subprocess.Popen(
-                [self.runtime_cmd, "version", "--format", "{{json .}}"],
-                stdout=d_out,
-                stderr=d_err,
-            ).wait()
+        self.logger.debug(f"querying {self.variant_name()} version and details")
+        d_proc = subprocess.run(
+            [self.runtime_cmd, "version", "--format", "{{json .}}"],
+            capture_output=True,
+        )
+        d_retval = d_proc.returncode
 
-            self.logger.debug(f"{self.variant_name()} version retval: {d_retval}")
+        self.logger.debug(f"{self.variant_name()} version retval: {d_retval}")
 
-            with open(d_out.name, mode="r") as c_stF:
-                d_out_v = c_stF.read()
-            with open(d_err.name, "r") as c_stF:
-                d_err_v = c_stF.read()
+        d_out_v = d_proc.stdout.decode("utf-8", errors="replace")
+        d_err_v = d_proc.stderr.decode("utf-8", errors="replace")
 
-            self.logger.debug(f"{self.variant_name()} version stdout: {d_out_v}")
+        self.logger.debug(f"{self.variant_name()} version stdout: {d_out_v}")
 
-            self.logger.debug(f"{self.variant_name()} version stderr: {d_err_v}")
+        self.logger.debug(f"{self.variant_name()} version stderr: {d_err_v}")
 
-            return cast("ExitVal", d_retval), d_out_v, d_err_v
+        return cast("ExitVal", d_retval), d_out_v, d_err_v
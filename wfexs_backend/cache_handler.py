@@ -20,17 +20,17 @@ from __future__ import absolute_import
 
 import copy
 import datetime
-import hashlib
 import inspect
 import json
 import logging
 import os
 import os.path
 import shutil
+import threading
 import traceback
-import types
 import urllib.parse
 import uuid
+import weakref
 
 from typing import (
     cast,
@@ -127,6 +127,7 @@ from .utils.contents import link_or_copy
 from .utils.digests import (
     ComputeDigestFromDirectory,
     ComputeDigestFromFile,
+    hashed_id_from_string,
     stringifyFilenameDigest,
 )
 from .utils.misc import (
@@ -160,6 +161,13 @@ class CacheHandlerSchemeException(CacheHandlerException):
 class SchemeHandlerCacheHandler:
     CACHE_METADATA_SCHEMA = cast("RelPath", "cache-metadata.json")
 
+    # Process-wide table of the fetches in flight. Each entry vanishes
+    # once no thread is fetching or waiting for its URIs
+    _INFLIGHT_FETCHES: "weakref.WeakValueDictionary[str, threading.RLock]" = (
+        weakref.WeakValueDictionary()
+    )
+    _INFLIGHT_FETCHES_LOCK = threading.Lock()
+
     def __init__(
         self,
         cacheDir: "AbsPath",
@@ -210,15 +218,8 @@ class SchemeHandlerCacheHandler:
                 fetcher=inst_handler.fetch,
                 description=inst_handler.description,
             )
-        elif isinstance(handler, DocumentedProtocolFetcher) and isinstance(
-            handler.fetcher,
-            (
-                types.FunctionType,
-                types.LambdaType,
-                types.MethodType,
-                types.BuiltinFunctionType,
-                types.BuiltinMethodType,
-            ),
+        elif isinstance(handler, DocumentedProtocolFetcher) and callable(
+            handler.fetcher
         ):
             the_handler = handler
         else:
@@ -278,26 +279,28 @@ class SchemeHandlerCacheHandler:
     def _genUriMetaCachedFilename(
         self, hashDir: "AbsPath", the_remote_file: "URIType"
     ) -> "Tuple[AbsPath, RelPath, AbsPath]":
-        input_file = hashlib.sha1(the_remote_file.encode("utf-8")).hexdigest()
-        metadata_input_file = input_file + META_JSON_POSTFIX
+        input_file = hashed_id_from_string(the_remote_file)
+        # The metadata file lives next to the symlink, so a single join is needed
+        abs_input_file = os.path.join(hashDir, input_file)
 
         return (
-            cast("AbsPath", os.path.join(hashDir, metadata_input_file)),
+            cast("AbsPath", abs_input_file + META_JSON_POSTFIX),
             cast("RelPath", input_file),
-            cast("AbsPath", os.path.join(hashDir, input_file)),
+            cast("AbsPath", abs_input_file),
         )
 
     @staticmethod
     def getHashDir(destdir: "AbsPath") -> "AbsPath":
         hashDir = os.path.join(destdir, "uri_hashes")
-        if not os.path.exists(hashDir):
-            try:
-                os.makedirs(hashDir)
-            except IOError:
-                errstr = "ERROR: Unable to create directory for workflow URI hashes {}.".format(
+        try:
+            os.makedirs(hashDir, exist_ok=True)
+        except IOError:
+            errstr = (
+                "ERROR: Unable to create directory for workflow URI hashes {}.".format(
                     hashDir
                 )
-                raise CacheHandlerException(errstr)
+            )
+            raise CacheHandlerException(errstr)
 
         return cast("AbsPath", hashDir)
 
@@ -684,51 +687,61 @@ class SchemeHandlerCacheHandler:
             finalCachedFilename = None
 
         # Saving the metadata
-        with open(uriMetaCachedFilename, mode="w", encoding="utf-8") as mOut:
-            # Serializing the metadata
-            if fetched_metadata_array is None:
-                fetched_metadata_array = [
-                    URIWithMetadata(uri=the_remote_uri, metadata={"injected": True})
-                ]
-            metaStructure = {
-                "stamp": datetime.datetime.now(tz=datetime.timezone.utc),
-                "metadata_array": list(
-                    map(
-                        lambda m: {
-                            "uri": m.uri,
-                            "metadata": m.metadata,
-                            "preferredName": m.preferredName,
-                        },
-                        fetched_metadata_array,
-                    )
-                ),
-                "licences": the_licences,
-            }
-            if finalCachedFilename is not None:
-                metaStructure["kind"] = str(cast("ContentKind", inputKind).value)
-                metaStructure["fingerprint"] = fingerprint
-                metaStructure["path"] = {
-                    "relative": os.path.relpath(finalCachedFilename, hashDir),
-                    "absolute": finalCachedFilename,
+        # The metadata is written aside and atomically renamed afterwards,
+        # so an interrupted write never leaves a truncated cache entry
+        tempMetaCachedFilename = uriMetaCachedFilename + ".part-" + str(uuid.uuid4())
+        try:
+            with open(tempMetaCachedFilename, mode="w", encoding="utf-8") as mOut:
+                # Serializing the metadata
+                if fetched_metadata_array is None:
+                    fetched_metadata_array = [
+                        URIWithMetadata(uri=the_remote_uri, metadata={"injected": True})
+                    ]
+                metaStructure = {
+                    "stamp": datetime.datetime.now(tz=datetime.timezone.utc),
+                    "metadata_array": list(
+                        map(
+                            lambda m: {
+                                "uri": m.uri,
+                                "metadata": m.metadata,
+                                "preferredName": m.preferredName,
+                            },
+                            fetched_metadata_array,
+                        )
+                    ),
+                    "licences": the_licences,
                 }
-            else:
-                metaStructure["resolves_to"] = inputKind
+                if finalCachedFilename is not None:
+                    metaStructure["kind"] = str(cast("ContentKind", inputKind).value)
+                    metaStructure["fingerprint"] = fingerprint
+                    metaStructure["path"] = {
+                        "relative": os.path.relpath(finalCachedFilename, hashDir),
+                        "absolute": finalCachedFilename,
+                    }
+                else:
+                    metaStructure["resolves_to"] = inputKind
 
-            json.dump(metaStructure, mOut, cls=DatetimeEncoder)
+                json.dump(metaStructure, mOut, cls=DatetimeEncoder)
 
-            if self.logger.getEffectiveLevel() <= logging.DEBUG:
-                flatMetaStructure = json.loads(
-                    json.dumps(metaStructure, cls=DatetimeEncoder)
-                )
-                val_errors = config_validate(
-                    flatMetaStructure, self.CACHE_METADATA_SCHEMA
-                )
-                if len(val_errors) > 0:
-                    self.logger.error(
-                        f"CMSVE => {len(val_errors)} errors in just stored cache metadata file {uriMetaCachedFilename}"
+                if self.logger.getEffectiveLevel() <= logging.DEBUG:
+                    flatMetaStructure = json.loads(
+                        json.dumps(metaStructure, cls=DatetimeEncoder)
                     )
-                    for i_err, val_error in enumerate(val_errors):
-                        self.logger.error(f"CMSVE {i_err}: {val_error}")
+                    val_errors = config_validate(
+                        flatMetaStructure, self.CACHE_METADATA_SCHEMA
+                    )
+                    if len(val_errors) > 0:
+                        self.logger.error(
+                            f"CMSVE => {len(val_errors)} errors in just stored cache metadata file {uriMetaCachedFilename}"
+                        )
+                        for i_err, val_error in enumerate(val_errors):
+                            self.logger.error(f"CMSVE {i_err}: {val_error}")
+
+            os.replace(tempMetaCachedFilename, uriMetaCachedFilename)
+        finally:
+            # A failed write or validation should not leave the partial file behind
+            if os.path.lexists(tempMetaCachedFilename):
+                os.unlink(tempMetaCachedFilename)
 
         return finalCachedFilename, fingerprint
 
@@ -831,20 +844,42 @@ class SchemeHandlerCacheHandler:
         if destdir is None:
             destdir = self.cacheDir
 
-        # The directory with the content, whose name is based on sha256
-        if not os.path.exists(destdir):
-            try:
-                os.makedirs(destdir)
-            except IOError:
-                errstr = (
-                    "ERROR: Unable to create directory for workflow inputs {}.".format(
-                        destdir
-                    )
-                )
-                raise CacheHandlerException(errstr)
+        # Concurrent fetches of the very same URIs into the very same
+        # destination wait for the first one, so they get a cache hit
+        # instead of downloading the content again
+        inflight_key = json.dumps(
+            [os.path.abspath(destdir), remote_file, sec_context_name], default=str
+        )
+        with self._INFLIGHT_FETCHES_LOCK:
+            inflight_lock = self._INFLIGHT_FETCHES.get(inflight_key)
+            if inflight_lock is None:
+                inflight_lock = threading.RLock()
+                self._INFLIGHT_FETCHES[inflight_key] = inflight_lock
+
+        with inflight_lock:
+            return self._fetch(
+                remote_file,
+                offline,
+                destdir=destdir,
+                ignoreCache=ignoreCache,
+                registerInCache=registerInCache,
+                vault=vault,
+                sec_context_name=sec_context_name,
+            )
 
+    def _fetch(
+        self,
+        remote_file: "Union[AnyURI, urllib.parse.ParseResult, Sequence[AnyURI], Sequence[urllib.parse.ParseResult]]",
+        offline: "bool",
+        destdir: "AbsPath",
+        ignoreCache: "bool" = False,
+        registerInCache: "bool" = True,
+        vault: "Optional[SecurityContextVault]" = None,
+        sec_context_name: "Optional[str]" = None,
+    ) -> "CachedContent":
         # The directory where the symlinks derived from SHA1 obtained from URIs
-        # to the content are placed
+        # to the content are placed. Creating it also creates the directory
+        # with the content, whose name is based on sha256
         hashDir = self.getHashDir(destdir)
 
         # This filename will only be used when content is being fetched
@@ -900,26 +935,20 @@ class SchemeHandlerCacheHandler:
             for a_remote_file in altInputs:
                 attachedSecContext = None
                 the_licences: "Tuple[URIType, ...]" = tuple()
+                # The URI is only parsed on a cache miss, as a warm
+                # cache hit does not need it at all
+                parsedInputURL: "Optional[urllib.parse.ParseResult]" = None
                 if isinstance(a_remote_file, urllib.parse.ParseResult):
                     parsedInputURL = a_remote_file
                     the_remote_file = cast(
                         "URIType", urllib.parse.urlunparse(a_remote_file)
                     )
+                elif isinstance(a_remote_file, LicensedURI):
+                    the_remote_file = a_remote_file.uri
+                    attachedSecContext = a_remote_file.secContext
+                    the_licences = a_remote_file.licences
                 else:
-                    if isinstance(a_remote_file, LicensedURI):
-                        the_remote_file = a_remote_file.uri
-                        attachedSecContext = a_remote_file.secContext
-                        the_licences = a_remote_file.licences
-                    else:
-                        the_remote_file = a_remote_file
-
-                    # Dealing with an odd behaviour from urlparse
-                    for det in ("/", "?", "#"):
-                        if det in the_remote_file:
-                            parsedInputURL = urllib.parse.urlparse(the_remote_file)
-                            break
-                    else:
-                        parsedInputURL = urllib.parse.urlparse(the_remote_file + "#")
+                    the_remote_file = a_remote_file
 
                 # uriCachedFilename is going to be always a symlink
                 (
@@ -931,22 +960,23 @@ class SchemeHandlerCacheHandler:
                 # TODO: check cached state in future database
                 # Cleaning up
                 if registerInCache and ignoreCache:
-                    # Removing the metadata
-                    if os.path.exists(uriMetaCachedFilename):
-                        os.unlink(uriMetaCachedFilename)
-
-                    # Removing the symlink
-                    if os.path.exists(absUriCachedFilename):
-                        os.unlink(absUriCachedFilename)
+                    # Removing the metadata and the symlink
+                    for cleanable in (uriMetaCachedFilename, absUriCachedFilename):
+                        try:
+                            os.unlink(cleanable)
+                        except FileNotFoundError:
+                            pass
                     # We cannot remove the content as
                     # it could be referenced by other symlinks
 
-                refetch = (
-                    not registerInCache
-                    or ignoreCache
-                    or not os.path.exists(uriMetaCachedFilename)
-                    or os.stat(uriMetaCachedFilename).st_size == 0
-                )
+                refetch = not registerInCache or ignoreCache
+                if not refetch:
+                    # A single stat answers both whether the metadata
+                    # file exists and whether it is empty
+                    try:
+                        refetch = os.stat(uriMetaCachedFilename).st_size == 0
+                    except OSError:
+                        refetch = True
 
                 metaStructure: "Optional[CacheMetadataDict]" = None
                 if not refetch:
@@ -1007,6 +1037,17 @@ class SchemeHandlerCacheHandler:
                     # As the content still exists, get the metadata
                     break
                 else:
+                    if parsedInputURL is None:
+                        # Dealing with an odd behaviour from urlparse
+                        for det in ("/", "?", "#"):
+                            if det in the_remote_file:
+                                parsedInputURL = urllib.parse.urlparse(the_remote_file)
+                                break
+                        else:
+                            parsedInputURL = urllib.parse.urlparse(
+                                the_remote_file + "#"
+                            )
+
                     # Prepare the attachedSecContext
                     usableSecContext = cast(
                         "WritableSecurityContextConfig", copy.copy(currentSecContext)
@@ -1064,9 +1105,15 @@ class SchemeHandlerCacheHandler:
                     the_licences,
                 ) in uncachedInputs:
                     # Content is fetched here
-                    # As of RFC3986, schemes are case insensitive
-                    theScheme = parsedInputURL.scheme.lower()
+                    # As of RFC3986, schemes are case insensitive.
+                    # Handlers are registered in lowercase, and urlparse
+                    # already lowercases the scheme, so lowering it is
+                    # only needed for externally built parse results
+                    theScheme = parsedInputURL.scheme
                     schemeHandler = self.schemeHandlers.get(theScheme)
+                    if schemeHandler is None and not theScheme.islower():
+                        theScheme = theScheme.lower()
+                        schemeHandler = self.schemeHandlers.get(theScheme)
 
                     try:
                         if schemeHandler is None:
@@ -1110,24 +1157,23 @@ class SchemeHandlerCacheHandler:
                             # Now, creating the symlink
                             # (which should not be needed in the future)
                             if finalCachedFilename is not None:
-                                if os.path.isfile(finalCachedFilename):
-                                    os.unlink(finalCachedFilename)
-                                elif os.path.isdir(finalCachedFilename):
+                                # Files are atomically replaced
+                                if os.path.isdir(finalCachedFilename):
                                     shutil.rmtree(finalCachedFilename)
-                                os.rename(tempCachedFilename, finalCachedFilename)
+                                os.replace(tempCachedFilename, finalCachedFilename)
 
                                 next_input_file = os.path.relpath(
                                     finalCachedFilename, hashDir
                                 )
                             else:
-                                next_input_file = hashlib.sha1(
-                                    the_remote_file.encode("utf-8")
-                                ).hexdigest()
-
-                            if os.path.lexists(absUriCachedFilename):
-                                os.unlink(absUriCachedFilename)
+                                next_input_file = hashed_id_from_string(the_remote_file)
 
-                            os.symlink(next_input_file, absUriCachedFilename)
+                            # The symlink is also atomically replaced
+                            tempUriCachedFilename = (
+                                absUriCachedFilename + ".part-" + str(uuid.uuid4())
+                            )
+                            os.symlink(next_input_file, tempUriCachedFilename)
+                            os.replace(tempUriCachedFilename, absUriCachedFilename)
 
                             # Store the metadata
                             metadata_array.extend(fetched_metadata_array)
@@ -1152,6 +1198,15 @@ class SchemeHandlerCacheHandler:
                                 ) from nested_exception
                             else:
                                 raise CacheHandlerException(errmsg)
+                        finally:
+                            # Partial contents from a failed fetch are
+                            # removed, so they are never taken as cached
+                            if os.path.isdir(tempCachedFilename) and not os.path.islink(
+                                tempCachedFilename
+                            ):
+                                shutil.rmtree(tempCachedFilename, ignore_errors=True)
+                            elif os.path.lexists(tempCachedFilename):
+                                os.unlink(tempCachedFilename)
                     except FetcherException as wfe:
                         # Keeping the newest element of the chain
                         nested_exception = wfe
@@ -21,7 +21,6 @@ import copy
 from dataclasses import dataclass
 import os
 import tempfile
-import atexit
 import platform
 import shutil
 import subprocess
@@ -89,6 +88,7 @@ if TYPE_CHECKING:
     YAMLLoader: TypeAlias = Union[yaml.Loader, yaml.CLoader]
 
 from . import common
+from .utils.contents import register_tempdir_cleanup
 
 # A couple of constants needed for several fixes
 DOCKER_SCHEME: "Final[str]" = "docker"
@@ -254,14 +254,14 @@ class ContainerFactory(abc.ABC):
                     "AbsPath", tempfile.mkdtemp(prefix="wfexs", suffix="backend")
                 )
                 # Assuring this temporal directory is removed at the end
-                atexit.register(shutil.rmtree, cacheDir)
+                register_tempdir_cleanup(cacheDir)
 
         if tempDir is None:
             tempDir = cast(
                 "AbsPath", tempfile.mkdtemp(prefix="WfExS-container", suffix="tempdir")
             )
             # Assuring this temporal directory is removed at the end
-            atexit.register(shutil.rmtree, tempDir)
+            register_tempdir_cleanup(tempDir)
 
         # This directory might be needed by temporary processes, like
         # image materialization in singularity or podman
@@ -285,6 +285,9 @@ class ContainerFactory(abc.ABC):
         # This variable contains the dictionary of set up environment
         # variables needed to run the tool with the proper setup
         self._environment: "MutableMapping[str, str]" = dict()
+        # And this one is the composition with the process environment,
+        # which is built on demand and reused by every engine call
+        self._matEnv: "Optional[Mapping[str, str]]" = None
 
         # This variable contains the set of optional features
         # supported by this container factory in this installation
@@ -324,6 +327,22 @@ class ContainerFactory(abc.ABC):
     def environment(self) -> "Mapping[str, str]":
         return self._environment
 
+    def _update_environment(self, new_environment: "Mapping[str, str]") -> None:
+        self._environment.update(new_environment)
+        self._matEnv = None
+
+    @property
+    def materialization_environment(self) -> "Mapping[str, str]":
+        """
+        The process environment, plus the variables needed by this
+        container factory
+        """
+        if self._matEnv is None:
+            matEnv = dict(os.environ)
+            matEnv.update(self._environment)
+            self._matEnv = matEnv
+        return self._matEnv
+
     @property
     def containerType(self) -> "common.ContainerType":
         return self.ContainerType()
@@ -347,8 +366,7 @@ class ContainerFactory(abc.ABC):
         the default implementation is this
         """
 
-        matEnv = dict(os.environ)
-        matEnv.update(self.environment)
+        matEnv = self.materialization_environment
         with tempfile.NamedTemporaryFile() as e_err:
             with subprocess.Popen(
                 [self.runtime_cmd, "--version"],
@@ -459,7 +477,7 @@ STDERR
                     containers_dir=containers_dir,
                     force=force,
                 )
-                if was_redeployed is not None:
+                if was_redeployed:
                     redeployed_containers.append(container)
 
         return redeployed_containers
@@ -19,6 +19,8 @@ from __future__ import absolute_import
 
 import copy
 import datetime
+import fcntl
+import functools
 import json
 import logging
 import os
@@ -126,6 +128,31 @@ def _normalize_sif_id(string: "str") -> "RelPath":
     return cast("RelPath", string.replace("/", "_") + ".sif")
 
 
+def _checked_run(
+    cmd: "Sequence[str]",
+    errmsg: "str",
+    cwd: "Optional[str]" = None,
+    env: "Optional[Mapping[str, str]]" = None,
+) -> "bytes":
+    """
+    It runs the command, returning what it wrote to stdout. When it
+    fails, both captured outputs are reported in the raised exception
+    """
+    proc = subprocess.run(cmd, capture_output=True, cwd=cwd, env=env)
+
+    # Proper error handling
+    if proc.returncode != 0:
+        errstr = "{}. Retval {}\n======\nSTDOUT\n======\n{}\n======\nSTDERR\n======\n{}".format(
+            errmsg,
+            proc.returncode,
+            proc.stdout.decode("utf-8", errors="replace"),
+            proc.stderr.decode("utf-8", errors="replace"),
+        )
+        raise WorkflowEngineException(errstr)
+
+    return proc.stdout
+
+
 class CWLWorkflowEngine(WorkflowEngine):
     CWLTOOL_PYTHON_PACKAGE = "cwltool"
     CWL_UTILS_PYTHON_PACKAGE = "cwl-utils"
@@ -159,6 +186,17 @@ class CWLWorkflowEngine(WorkflowEngine):
 
     INPUT_DECLARATIONS_FILENAME = "inputdeclarations.yaml"
 
+    HINT_FILE_PATTERNS = ("*.cwl",)
+
+    # Mark left in the virtual environment after a successful installation
+    INSTALLED_MARK = ".wfexs_installed"
+
+    # pip is run through the interpreter of each virtual environment,
+    # so long installation paths do not hit the shebang length limit
+    VENV_PYTHON_RELPATH = os.path.join("bin", "python")
+    PIP_MODULE_ARGS = ("-m", "pip")
+    PIP_UPGRADE_ARGS = ("install", "--upgrade", "pip", "wheel")
+
     NODEJS_WRAPPER = "nodejs_wrapper.bash"
 
     NODEJS_CONTAINER_TAG = ContainerTaggedName(
@@ -272,7 +310,9 @@ class CWLWorkflowEngine(WorkflowEngine):
         os.makedirs(self.cacheWorkflowPackDir, exist_ok=True)
 
     @classmethod
+    @functools.lru_cache(maxsize=None)
     def MyWorkflowType(cls) -> "WorkflowType":
+        # The description is built only once per class
         # As of https://about.workflowhub.eu/Workflow-RO-Crate/ ,
         # the rocrate_programming_language should be next
         return WorkflowType(
@@ -391,11 +431,77 @@ class CWLWorkflowEngine(WorkflowEngine):
             "EnginePath", os.path.join(self.weCacheDir, inst_engineVersion)
         )
 
+        # Concurrent materializations of the same version are serialized
+        os.makedirs(self.weCacheDir, exist_ok=True)
+        with open(cwltool_install_dir + ".lock", mode="a") as lockH:
+            fcntl.flock(lockH, fcntl.LOCK_EX)
+            self._installEngineVersionLocal(
+                cwltool_install_dir,
+                cwltoolPackage + cwltoolMatchOp + inst_engineVersion,
+                inst_engineVersion,
+            )
+
+        return (
+            engineVersion,
+            cwltool_install_dir,
+            cast("Fingerprint", engineVersion),
+        )
+
+    def _installEngineVersionLocal(
+        self,
+        cwltool_install_dir: "EnginePath",
+        cwltoolSpec: "str",
+        inst_engineVersion: "str",
+    ) -> None:
+        """
+        It installs cwltool in its own virtual environment, unless
+        it was already properly installed
+        """
+        # Successful installations leave a mark, so next materializations
+        # do not have to run cwltool in order to learn its version
+        installed_mark = os.path.join(cwltool_install_dir, self.INSTALLED_MARK)
+        if os.path.isfile(installed_mark):
+            with open(installed_mark, mode="r", encoding="utf-8") as iH:
+                if iH.read() == cwltoolSpec:
+                    return
+
         # Creating the virtual environment needed to separate CWL code
-        # from workflow execution backend
+        # from workflow execution backend. It is a hardlinked clone of the
+        # base one, so the bootstrapped pip and wheel are shared
         do_install = True
+        upgrade_pip = False
+        use_only_wheels = False
+        # Each version has its own wheels directory, so it is only
+        # filled under the lock of that version
+        wheels_dir = os.path.join(self.weCacheDir, "_wheels", inst_engineVersion)
+        os.makedirs(wheels_dir, exist_ok=True)
         if not os.path.isdir(cwltool_install_dir):
-            venv.create(cwltool_install_dir, with_pip=True)
+            base_venv_dir = self._ensureBaseVenv()
+
+            # Fetching cwltool and its dependencies into the wheels
+            # directory overlaps the cloning of the environment
+            with subprocess.Popen(
+                [
+                    *self._venvPipCmd(base_venv_dir),
+                    "download",
+                    "-d",
+                    wheels_dir,
+                    cwltoolSpec,
+                ],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                cwd=base_venv_dir,
+            ) as pip_download:
+                self._cloneVenv(base_venv_dir, cwltool_install_dir)
+                _, pip_download_stderr = pip_download.communicate()
+
+            # When the download failed, pip install will try again
+            use_only_wheels = pip_download.returncode == 0
+            if not use_only_wheels:
+                self.logger.debug(
+                    f"Could not prefetch {cwltoolSpec}. Retval {pip_download.returncode}\n"
+                    + pip_download_stderr.decode("utf-8", errors="replace")
+                )
         else:
             # Check the installation is up and running
             # creating a "fake" MaterializedWorkflowEngine
@@ -425,8 +531,13 @@ class CWLWorkflowEngine(WorkflowEngine):
                 self.logger.debug(
                     f"cwltool mismatch {inst_engineVersion} vs {installed_engineVersion}"
                 )
+                upgrade_pip = True
 
         if do_install:
+            # An interrupted installation should not be trusted
+            if os.path.lexists(installed_mark):
+                os.unlink(installed_mark)
+
             # Let's be sure the nodejs wrapper, needed by cwltool versions
             # prior to 3.1.20210921111717 is in place
             # installWrapper = engineVersion < self.NO_WRAPPER_CWLTOOL_VERSION
@@ -456,77 +567,151 @@ class CWLWorkflowEngine(WorkflowEngine):
                 if not os.path.islink(nodejs_wrapper_inst_path):
                     os.symlink("node", nodejs_wrapper_inst_path)
 
+            if upgrade_pip:
+                self._upgradeVenvPip(cwltool_install_dir)
+
             # Now, time to run it
             instEnv = dict(os.environ)
 
-            with tempfile.NamedTemporaryFile() as cwltool_install_stdout:
-                with tempfile.NamedTemporaryFile() as cwltool_install_stderr:
-                    retVal = subprocess.Popen(
-                        [
-                            f"{cwltool_install_dir}/bin/pip",
-                            "install",
-                            "--upgrade",
-                            "pip",
-                            "wheel",
-                        ],
-                        stdout=cwltool_install_stdout,
-                        stderr=cwltool_install_stderr,
+            pip_install_cmd = [
+                *self._venvPipCmd(cwltool_install_dir),
+                "install",
+                "--find-links",
+                wheels_dir,
+                cwltoolSpec,
+                # Commented out, as WfExS is not currently using cwl-utils
+                #    self.SCHEMA_SALAD_PYTHON_PACKAGE, self.DEFAULT_SCHEMA_SALAD_VERSION,
+                #    self.CWL_UTILS_PYTHON_PACKAGE, self.DEFAULT_CWL_UTILS_VERSION,
+            ]
+            if use_only_wheels:
+                # pip download does not fetch the build backends needed
+                # by dependencies only available as sdists, so the
+                # offline installation can fail where the online one works
+                try:
+                    _checked_run(
+                        [*pip_install_cmd, "--no-index"],
+                        f"Could not install CWL {cwltoolSpec} from prefetched wheels",
                         cwd=cwltool_install_dir,
                         env=instEnv,
-                    ).wait()
+                    )
+                except WorkflowEngineException as wee:
+                    self.logger.debug(f"{wee}\nRetrying with package index")
+                    use_only_wheels = False
+
+            if not use_only_wheels:
+                _checked_run(
+                    pip_install_cmd,
+                    f"Could not install CWL {cwltoolSpec} ",
+                    cwd=cwltool_install_dir,
+                    env=instEnv,
+                )
 
-                    # Proper error handling
-                    if retVal != 0:
-                        # Reading the output and error for the report
-                        with open(cwltool_install_stdout.name, "r") as c_stF:
-                            cwltool_install_stdout_v = c_stF.read()
-                        with open(cwltool_install_stderr.name, "r") as c_stF:
-                            cwltool_install_stderr_v = c_stF.read()
-
-                        errstr = "Could not upgrade pip. Retval {}\n======\nSTDOUT\n======\n{}\n======\nSTDERR\n======\n{}".format(
-                            retVal,
-                            cwltool_install_stdout_v,
-                            cwltool_install_stderr_v,
-                        )
-                        raise WorkflowEngineException(errstr)
+        with open(installed_mark, mode="w", encoding="utf-8") as iH:
+            iH.write(cwltoolSpec)
 
-                    retVal = subprocess.Popen(
-                        [
-                            f"{cwltool_install_dir}/bin/pip",
-                            "install",
-                            cwltoolPackage + cwltoolMatchOp + inst_engineVersion,
-                        ],
-                        # Commented out, as WfExS is not currently using cwl-utils
-                        #    self.SCHEMA_SALAD_PYTHON_PACKAGE, self.DEFAULT_SCHEMA_SALAD_VERSION,
-                        #    self.CWL_UTILS_PYTHON_PACKAGE, self.DEFAULT_CWL_UTILS_VERSION,
-                        stdout=cwltool_install_stdout,
-                        stderr=cwltool_install_stderr,
-                        cwd=cwltool_install_dir,
-                        env=instEnv,
-                    ).wait()
+    def _ensureBaseVenv(self) -> "EnginePath":
+        """
+        It returns the path to the base virtual environment, with
+        up to date pip and wheel, which is cloned for each cwltool version
+        """
+        base_venv_dir = cast("EnginePath", os.path.join(self.weCacheDir, "_base"))
+        base_mark = os.path.join(base_venv_dir, self.INSTALLED_MARK)
+        with open(base_venv_dir + ".lock", mode="a") as lockH:
+            fcntl.flock(lockH, fcntl.LOCK_EX)
+            if not os.path.isfile(base_mark):
+                # Removing the remains of an interrupted creation
+                if os.path.isdir(base_venv_dir):
+                    shutil.rmtree(base_venv_dir)
+                self._createVenv(base_venv_dir)
+                self._upgradeVenvPip(base_venv_dir)
+
+                with open(base_mark, mode="w", encoding="utf-8") as bH:
+                    bH.write("base")
+
+        return base_venv_dir
+
+    def _createVenv(self, venv_dir: "EnginePath") -> None:
+        """
+        uv creates and seeds virtual environments much faster than
+        the ensurepip bootstrap done by venv, so it is used when available
+        """
+        uv_cmd = shutil.which("uv")
+        if uv_cmd is not None:
+            uv_venv = subprocess.run(
+                [
+                    uv_cmd,
+                    "venv",
+                    "--seed",
+                    "--python",
+                    sys.executable,
+                    venv_dir,
+                ],
+                capture_output=True,
+            )
+            if uv_venv.returncode == 0:
+                return
 
-                    # Proper error handling
-                    if retVal != 0:
-                        # Reading the output and error for the report
-                        with open(cwltool_install_stdout.name, "r") as c_stF:
-                            cwltool_install_stdout_v = c_stF.read()
-                        with open(cwltool_install_stderr.name, "r") as c_stF:
-                            cwltool_install_stderr_v = c_stF.read()
-
-                        errstr = "Could not install CWL {} . Retval {}\n======\nSTDOUT\n======\n{}\n======\nSTDERR\n======\n{}".format(
-                            engineVersion,
-                            retVal,
-                            cwltool_install_stdout_v,
-                            cwltool_install_stderr_v,
-                        )
-                        raise WorkflowEngineException(errstr)
+            self.logger.debug(
+                f"uv could not create {venv_dir}. Retval {uv_venv.returncode}\n"
+                + uv_venv.stderr.decode("utf-8", errors="replace")
+            )
+            if os.path.isdir(venv_dir):
+                shutil.rmtree(venv_dir)
 
-            # TODO
+        venv.create(venv_dir, with_pip=True)
 
+    def _cloneVenv(self, base_venv_dir: "EnginePath", venv_dir: "EnginePath") -> None:
+        """
+        The libraries of the base virtual environment are hardlinked,
+        but its scripts and configuration embed the path of the base
+        environment, so they are copied and rewritten
+        """
+        venv_own_entries = ("bin", "pyvenv.cfg", self.INSTALLED_MARK)
+        shutil.copytree(
+            base_venv_dir,
+            venv_dir,
+            symlinks=True,
+            copy_function=os.link,
+            ignore=lambda src, names: [
+                name for name in names if name in venv_own_entries
+            ]
+            if src == base_venv_dir
+            else [],
+        )
+        venv_bin_dir = os.path.join(venv_dir, "bin")
+        shutil.copytree(os.path.join(base_venv_dir, "bin"), venv_bin_dir, symlinks=True)
+        venv_cfg = os.path.join(venv_dir, "pyvenv.cfg")
+        shutil.copy2(os.path.join(base_venv_dir, "pyvenv.cfg"), venv_cfg)
+
+        base_venv_path = os.fsencode(base_venv_dir)
+        venv_path = os.fsencode(venv_dir)
+        for venv_file in (
+            venv_cfg,
+            *(os.path.join(venv_bin_dir, name) for name in os.listdir(venv_bin_dir)),
+        ):
+            if os.path.islink(venv_file) or not os.path.isfile(venv_file):
+                continue
+            with open(venv_file, mode="rb") as vH:
+                venv_content = vH.read()
+            # Binaries are not touched
+            if base_venv_path in venv_content and b"\0" not in venv_content:
+                with open(venv_file, mode="wb") as vH:
+                    vH.write(venv_content.replace(base_venv_path, venv_path))
+
+    def _venvPipCmd(self, venv_dir: "EnginePath") -> "Sequence[str]":
         return (
-            engineVersion,
-            cwltool_install_dir,
-            cast("Fingerprint", engineVersion),
+            os.path.join(venv_dir, self.VENV_PYTHON_RELPATH),
+            *self.PIP_MODULE_ARGS,
+        )
+
+    def _upgradeVenvPip(self, venv_dir: "EnginePath") -> None:
+        instEnv = dict(os.environ)
+
+        _checked_run(
+            [*self._venvPipCmd(venv_dir), *self.PIP_UPGRADE_ARGS],
+            "Could not upgrade pip",
+            cwd=venv_dir,
+            env=instEnv,
         )
 
     def _get_engine_version_str(
@@ -552,37 +737,18 @@ class CWLWorkflowEngine(WorkflowEngine):
         cwltool_install_dir = matWfEng.engine_path
 
         # Execute cwltool --version
-        with tempfile.NamedTemporaryFile() as cwltool_version_stderr:
-            # Writing straight to the file
-            with subprocess.Popen(
-                [f"{cwltool_install_dir}/bin/cwltool", "--version"],
-                stdout=subprocess.PIPE,
-                stderr=cwltool_version_stderr,
-                cwd=cwltool_install_dir,
-            ) as vP:
-                engine_ver: "str" = ""
-                if vP.stdout is not None:
-                    engine_ver = vP.stdout.read().decode("utf-8", errors="continue")
-                    self.logger.debug(f"{cwltool_install_dir} version => {engine_ver}")
-
-                retval = vP.wait()
-
-            # Proper error handling
-            if retval != 0:
-                # Reading the output and error for the report
-                with open(cwltool_version_stderr.name, "r") as c_stF:
-                    cwltool_version_stderr_v = c_stF.read()
-
-                errstr = "Could not get version running cwltool --version from {}. Retval {}\n======\nSTDOUT\n======\n{}\n======\nSTDERR\n======\n{}".format(
-                    cwltool_install_dir, retval, engine_ver, cwltool_version_stderr_v
-                )
-                raise WorkflowEngineException(errstr)
+        engine_ver = _checked_run(
+            [f"{cwltool_install_dir}/bin/cwltool", "--version"],
+            f"Could not get version running cwltool --version from {cwltool_install_dir}",
+            cwd=cwltool_install_dir,
+        ).decode("utf-8", errors="replace")
+        self.logger.debug(f"{cwltool_install_dir} version => {engine_ver}")
 
-            pref_ver = os.path.join(cwltool_install_dir, "bin") + "/"
-            if engine_ver.startswith(pref_ver):
-                engine_ver = engine_ver[len(pref_ver) :]
+        pref_ver = os.path.join(cwltool_install_dir, "bin") + "/"
+        if engine_ver.startswith(pref_ver):
+            engine_ver = engine_ver[len(pref_ver) :]
 
-            return cast("WorkflowEngineVersionStr", engine_ver.strip())
+        return cast("WorkflowEngineVersionStr", engine_ver.strip())
 
     def _enrichWorkflowDeps(
         self, localWf: "LocalWorkflow", engineVer: "EngineVersion"
@@ -592,47 +758,18 @@ class CWLWorkflowEngine(WorkflowEngine):
 
         assert localWf.relPath
         # Execute cwltool --print-deps
-        printed_deps_str = ""
-        with tempfile.NamedTemporaryFile() as cwltool_printdeps_stderr:
-            # Writing straight to the file
-            with subprocess.Popen(
-                [
-                    f"{cwltool_install_dir}/bin/cwltool",
-                    "--print-deps",
-                    "--relative-deps",
-                    "cwd",
-                    localWf.relPath,
-                ],
-                stdout=subprocess.PIPE,
-                stderr=cwltool_printdeps_stderr,
-                cwd=localWf.dir,
-            ) as pP:
-                if pP.stdout is not None:
-                    printed_deps_str = pP.stdout.read().decode(
-                        "utf-8", errors="continue"
-                    )
-                    self.logger.debug(
-                        f"{cwltool_install_dir} --print-deps => {printed_deps_str}"
-                    )
-
-                retval = pP.wait()
-
-            # Proper error handling
-            if retval != 0:
-                # Reading the output and error for the report
-                with open(cwltool_printdeps_stderr.name, "r") as c_stF:
-                    cwltool_printdeps_stderr_v = c_stF.read()
-
-                errstr = f"""Could not get workflow dependencies running cwltool --print-deps from {localWf.dir} {localWf.relPath} with {cwltool_install_dir}. Retval {retval}
-======
-STDOUT
-======
-{printed_deps_str}
-======
-STDERR
-======
-{cwltool_printdeps_stderr_v}"""
-                raise WorkflowEngineException(errstr)
+        printed_deps_str = _checked_run(
+            [
+                f"{cwltool_install_dir}/bin/cwltool",
+                "--print-deps",
+                "--relative-deps",
+                "cwd",
+                localWf.relPath,
+            ],
+            f"Could not get workflow dependencies running cwltool --print-deps from {localWf.dir} {localWf.relPath} with {cwltool_install_dir}",
+            cwd=localWf.dir,
+        ).decode("utf-8", errors="replace")
+        self.logger.debug(f"{cwltool_install_dir} --print-deps => {printed_deps_str}")
 
         # Is this a correct JSON?
         try:
@@ -706,15 +843,15 @@ STDERR
 
         # Extract hashes directories from localWorkflow
         (
-            localWorkflowUsedHashes_head,
+            localWorkflowUsedHashes_parent,
             localWorkflowUsedHashes_tail,
-        ) = localWorkflowDir.split("/")[-2:]
+        ) = os.path.split(os.path.normpath(localWorkflowDir))
+        localWorkflowUsedHashes_head = os.path.basename(localWorkflowUsedHashes_parent)
 
         # Setting up workflow packed name
         localWorkflowPackedName = (
-            os.path.join(localWorkflowUsedHashes_head, localWorkflowUsedHashes_tail)
-            + ".cwl"
-        ).replace("/", "_")
+            f"{localWorkflowUsedHashes_head}_{localWorkflowUsedHashes_tail}.cwl"
+        )
 
         # TODO: check whether the repo is newer than the packed file
 
@@ -739,10 +876,13 @@ STDERR
                     )
 
                 # Execute cwltool --pack
-                with open(packedLocalWorkflowFile, mode="wb") as packedH:
-                    with tempfile.NamedTemporaryFile() as cwltool_pack_stderr:
+                # It is written to a temporary file, renamed on success,
+                # so a failed pack does not leave a partial packed workflow
+                partialPackedLocalWorkflowFile = packedLocalWorkflowFile + ".part"
+                try:
+                    with open(partialPackedLocalWorkflowFile, mode="wb") as packedH:
                         # Writing straight to the file
-                        retVal = subprocess.Popen(
+                        cwltool_pack = subprocess.run(
                             [
                                 f"{cwltool_install_dir}/bin/cwltool",
                                 "--no-doc-cache",
@@ -750,20 +890,25 @@ STDERR
                                 localWorkflowFile,
                             ],
                             stdout=packedH,
-                            stderr=cwltool_pack_stderr,
+                            stderr=subprocess.PIPE,
                             cwd=cwltool_install_dir,
-                        ).wait()
+                        )
 
-                        # Proper error handling
-                        if retVal != 0:
-                            # Reading the output and error for the report
-                            with open(cwltool_pack_stderr.name, "r") as c_stF:
-                                cwltool_pack_stderr_v = c_stF.read()
+                    # Proper error handling
+                    if cwltool_pack.returncode != 0:
+                        errstr = "Could not pack CWL running cwltool --pack {}. Retval {}\n======\nSTDERR\n======\n{}".format(
+                            engineVersion,
+                            cwltool_pack.returncode,
+                            cwltool_pack.stderr.decode("utf-8", errors="replace"),
+                        )
+                        raise WorkflowEngineException(errstr)
 
-                            errstr = "Could not pack CWL running cwltool --pack {}. Retval {}\n======\nSTDERR\n======\n{}".format(
-                                engineVersion, retVal, cwltool_pack_stderr_v
-                            )
-                            raise WorkflowEngineException(errstr)
+                    os.replace(partialPackedLocalWorkflowFile, packedLocalWorkflowFile)
+                except BaseException:
+                    # Also when cwltool could not even be run
+                    if os.path.lexists(partialPackedLocalWorkflowFile):
+                        os.unlink(partialPackedLocalWorkflowFile)
+                    raise
 
                 # Last, deploy a copy of this packed workflow in the working directory
             link_or_copy(packedLocalWorkflowFile, consolidatedPackedWorkflowFile)
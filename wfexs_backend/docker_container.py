@@ -17,8 +17,10 @@
 # limitations under the License.
 from __future__ import absolute_import
 
+import concurrent.futures
 import json
 import os
+import threading
 from typing import (
     cast,
     TYPE_CHECKING,
@@ -28,6 +30,8 @@ if TYPE_CHECKING:
     from typing import (
         Any,
         Mapping,
+        MutableMapping,
+        MutableSequence,
         Optional,
         Sequence,
         Tuple,
@@ -51,6 +55,10 @@ if TYPE_CHECKING:
         URIType,
     )
 
+    from .abstract_docker_container import (
+        DockerLikeManifest,
+    )
+
     from .container import (
         DockerManifestMetadata,
     )
@@ -65,6 +73,7 @@ from .container import (
     Container,
     ContainerEngineException,
     ContainerFactoryException,
+    ContainerNotFoundException,
 )
 from .abstract_docker_container import (
     AbstractDockerContainerFactory,
@@ -75,6 +84,7 @@ from .utils.contents import (
     real_unlink_if_exists,
 )
 from .utils.digests import ComputeDigestFromFile
+from .utils.misc import json_loads
 
 
 class DockerContainerFactory(AbstractDockerContainerFactory):
@@ -82,6 +92,32 @@ class DockerContainerFactory(AbstractDockerContainerFactory):
         "RepoDigests",
     ]
 
+    # Pulls are network bound and independent, so they are run
+    # concurrently. The pool is shared among all the instances, and
+    # its size is capped in order to avoid overwhelming the docker daemon
+    MAX_MATERIALIZATION_WORKERS: "Final[int]" = 8
+    _POOL: "Final[concurrent.futures.ThreadPoolExecutor]" = (
+        concurrent.futures.ThreadPoolExecutor(
+            max_workers=MAX_MATERIALIZATION_WORKERS,
+            thread_name_prefix="wfexs-docker",
+        )
+    )
+
+    # Answers from docker inspect gathered when materializing, shared by
+    # all the instances within the process, so an already saved image
+    # is neither pulled nor saved again. Deployments do not use them,
+    # as they must reflect the current state of the docker daemon
+    _MANIFESTS_CACHE: "Final[MutableMapping[Tuple[str, str], Sequence[DockerLikeManifest]]]" = (
+        {}
+    )
+    _MANIFESTS_CACHE_LOCK: "Final[threading.Lock]" = threading.Lock()
+
+    # Different tags can resolve to the same image, so the work on
+    # each canonical path in the cache is serialized. Different images
+    # are saved concurrently
+    _CANONICAL_PATH_LOCKS: "Final[MutableMapping[str, threading.Lock]]" = {}
+    _CANONICAL_PATH_LOCKS_GUARD: "Final[threading.Lock]" = threading.Lock()
+
     @classmethod
     def trimmable_manifest_keys(cls) -> "Sequence[str]":
         return cls.TRIMMABLE_MANIFEST_KEYS
@@ -108,6 +144,107 @@ class DockerContainerFactory(AbstractDockerContainerFactory):
     def ContainerType(cls) -> "ContainerType":
         return ContainerType.Docker
 
+    def _getCachedManifests(
+        self, dockerTag: "str"
+    ) -> "Optional[Sequence[DockerLikeManifest]]":
+        with self._MANIFESTS_CACHE_LOCK:
+            return self._MANIFESTS_CACHE.get((self.runtime_cmd, dockerTag))
+
+    def _setCachedManifests(
+        self, dockerTag: "str", manifests: "Sequence[DockerLikeManifest]"
+    ) -> None:
+        # Empty answers are not cached, as they mean the image is not there
+        if len(manifests) > 0:
+            with self._MANIFESTS_CACHE_LOCK:
+                self._MANIFESTS_CACHE[(self.runtime_cmd, dockerTag)] = manifests
+
+    def _canonicalPathLock(self, canonicalContainerPath: "str") -> "threading.Lock":
+        with self._CANONICAL_PATH_LOCKS_GUARD:
+            return self._CANONICAL_PATH_LOCKS.setdefault(
+                os.path.abspath(canonicalContainerPath), threading.Lock()
+            )
+
+    def _linkCanonicalCopy(
+        self,
+        canonicalContainerPath: "AbsPath",
+        localContainerPath: "AbsPath",
+        localContainerPathMeta: "AbsPath",
+    ) -> None:
+        # Now, check the relative symbolic link of image
+        if os.path.lexists(localContainerPath):
+            os.unlink(localContainerPath)
+
+        os.symlink(
+            os.path.relpath(canonicalContainerPath, self.engineContainersSymlinkDir),
+            localContainerPath,
+        )
+
+        # Now, check the relative symbolic link of metadata
+        if os.path.lexists(localContainerPathMeta):
+            os.unlink(localContainerPathMeta)
+        os.symlink(
+            os.path.relpath(
+                canonicalContainerPath + META_JSON_POSTFIX,
+                self.engineContainersSymlinkDir,
+            ),
+            localContainerPathMeta,
+        )
+
+    def _reuseCanonicalCopy(
+        self,
+        dockerTag: "str",
+        localContainerPath: "AbsPath",
+        localContainerPathMeta: "AbsPath",
+    ) -> "Optional[DockerManifestMetadata]":
+        """
+        When the image was already saved within this process (for
+        instance, by a factory instance from other engine), the saved
+        copy is linked instead of pulling and saving it again
+        """
+        manifests = self._getCachedManifests(dockerTag)
+        if manifests is None:
+            return None
+
+        manifestsImageSignature = self._gen_trimmed_manifests_signature(manifests)
+        canonicalContainerPath = cast(
+            "AbsPath",
+            os.path.join(
+                self.containersCacheDir,
+                manifestsImageSignature.replace("=", "~")
+                .replace("/", "-")
+                .replace("+", "_"),
+            ),
+        )
+        # The copy could be being saved right now
+        with self._canonicalPathLock(canonicalContainerPath):
+            canonicalContainerPathMeta = canonicalContainerPath + META_JSON_POSTFIX
+            if not os.path.isfile(canonicalContainerPath) or not os.path.isfile(
+                canonicalContainerPathMeta
+            ):
+                return None
+
+            try:
+                with open(canonicalContainerPathMeta, mode="r", encoding="utf-8") as mH:
+                    manifest_metadata = cast("DockerManifestMetadata", json.load(mH))
+            except Exception as e:
+                self.logger.debug(
+                    f"Unreadable docker metadata at {canonicalContainerPathMeta}: {e}"
+                )
+                return None
+
+            # The saved copy is validated in the same way as the trusted ones
+            if manifest_metadata.get("manifests_signature") != manifestsImageSignature:
+                return None
+            imageSignature = ComputeDigestFromFile(canonicalContainerPath)
+            if manifest_metadata.get("image_signature") != imageSignature:
+                return None
+
+            self._linkCanonicalCopy(
+                canonicalContainerPath, localContainerPath, localContainerPathMeta
+            )
+
+            return manifest_metadata
+
     @classmethod
     def variant_name(self) -> "str":
         return "docker"
@@ -146,6 +283,64 @@ STDERR
                 "Ill-formed answer from docker version"
             ) from je
 
+    def materializeContainers(
+        self,
+        tagList: "Sequence[ContainerTaggedName]",
+        simpleFileNameMethod: "ContainerFileNamingMethod",
+        containers_dir: "Optional[AnyPath]" = None,
+        offline: "bool" = False,
+        force: "bool" = False,
+    ) -> "Sequence[Container]":
+        """
+        It is assured the containers are materialized. The pulls
+        are issued in parallel
+        """
+        materialized_containers: "MutableSequence[Container]" = []
+        not_found_containers: "MutableSequence[str]" = []
+
+        if containers_dir is None:
+            containers_dir = self.stagedContainersDir
+
+        # Repeated tags are materialized only once
+        futures: "MutableMapping[str, concurrent.futures.Future[Optional[Container]]]" = (
+            dict()
+        )
+        for tag in tagList:
+            if self.AcceptsContainer(tag) and tag.origTaggedName not in futures:
+                futures[tag.origTaggedName] = self._POOL.submit(
+                    self.materializeSingleContainer,
+                    tag,
+                    simpleFileNameMethod,
+                    containers_dir=containers_dir,
+                    offline=offline,
+                    force=force,
+                )
+
+        # Results are gathered following the original order, one per
+        # accepted tag, as ContainerFactory.materializeContainers does
+        try:
+            for tag in tagList:
+                future = futures.get(tag.origTaggedName)
+                if future is None:
+                    continue
+                container = future.result()
+                if container is not None:
+                    materialized_containers.append(container)
+                else:
+                    not_found_containers.append(tag.origTaggedName)
+        except BaseException:
+            # The pool is shared, so the pending work is not left behind
+            for future in futures.values():
+                future.cancel()
+            raise
+
+        if len(not_found_containers) > 0:
+            raise ContainerNotFoundException(
+                f"Could not fetch metadata for next tags because they were not found:\n{', '.join(not_found_containers)}"
+            )
+
+        return materialized_containers
+
     def materializeSingleContainer(
         self,
         tag: "ContainerTaggedName",
@@ -157,8 +352,7 @@ STDERR
         """
         It is assured the containers are materialized
         """
-        matEnv = dict(os.environ)
-        matEnv.update(self.environment)
+        matEnv = self.materialization_environment
 
         # It is an absolute URL, we are removing the docker://
         tag_name = tag.origTaggedName
@@ -329,6 +523,20 @@ STDERR
                         localContainerPath, putativeCanonicalContainerPath
                     )
 
+        if not force and not trusted_copy:
+            reused_metadata = self._reuseCanonicalCopy(
+                dockerTag, localContainerPath, localContainerPathMeta
+            )
+            if reused_metadata is not None:
+                self.logger.debug(
+                    f"Reusing the already saved docker image for {tag_name} => {dockerTag}"
+                )
+                image_id = reused_metadata["image_id"]
+                imageSignature = reused_metadata["image_signature"]
+                manifestsImageSignature = reused_metadata["manifests_signature"]
+                manifests = reused_metadata["manifests"]
+                trusted_copy = True
+
         # And now, the final judgement!
         if force or not trusted_copy:
             if offline:
@@ -345,8 +553,13 @@ STDERR
                 real_unlink_if_exists(localContainerPathMeta)
                 real_unlink_if_exists(localContainerPath)
 
-            # Blindly remove
-            _, _, _ = self._rmi(dockerTag, matEnv)
+            # docker pull already refreshes a stale local image, so the
+            # image is only blindly removed when a full fetch is forced.
+            # This way, at most two docker processes are spawned
+            if force:
+                _, _, _ = self._rmi(dockerTag, matEnv)
+                with self._MANIFESTS_CACHE_LOCK:
+                    self._MANIFESTS_CACHE.pop((self.runtime_cmd, dockerTag), None)
 
             # And now, let's materialize the new world
             d_retval, d_out_v, d_err_v = self._pull(dockerTag, matEnv)
@@ -371,13 +584,14 @@ STDERR
 
             # Parsing the output from docker inspect
             try:
-                manifests = cast("Sequence[Mapping[str, Any]]", json.loads(d_out_v))
+                manifests = cast("Sequence[Mapping[str, Any]]", json_loads(d_out_v))
                 manifest = manifests[0]
                 image_id = cast("Fingerprint", manifest["Id"])
             except Exception as e:
                 raise ContainerFactoryException(
                     f"FATAL ERROR: Docker finished properly but it did not properly materialize {tag_name}: {e}"
                 )
+            self._setCachedManifests(dockerTag, manifests)
 
             self.logger.info(
                 "saving docker container (for reproducibility matters): {} => {}".format(
@@ -394,71 +608,60 @@ STDERR
                 .replace("+", "_"),
             )
 
-            # Being sure the paths do not exist
-            if os.path.exists(canonicalContainerPath):
-                os.unlink(canonicalContainerPath)
-            canonicalContainerPathMeta = canonicalContainerPath + META_JSON_POSTFIX
-            if os.path.exists(canonicalContainerPathMeta):
-                os.unlink(canonicalContainerPathMeta)
-
-            # Now, save the image as such
-            d_retval, d_err_ev = self._save(
-                dockerTag, cast("AbsPath", canonicalContainerPath), matEnv
-            )
-            self.logger.debug("docker save retval: {}".format(d_retval))
-            self.logger.debug("docker save stderr: {}".format(d_err_v))
+            # Several tags could point to the same canonical path
+            with self._canonicalPathLock(canonicalContainerPath):
+                # Being sure the paths do not exist
+                if os.path.exists(canonicalContainerPath):
+                    os.unlink(canonicalContainerPath)
+                canonicalContainerPathMeta = canonicalContainerPath + META_JSON_POSTFIX
+                if os.path.exists(canonicalContainerPathMeta):
+                    os.unlink(canonicalContainerPathMeta)
+
+                # Now, save the image as such
+                d_retval, d_err_ev = self._save(
+                    dockerTag, cast("AbsPath", canonicalContainerPath), matEnv
+                )
+                self.logger.debug("docker save retval: {}".format(d_retval))
+                self.logger.debug("docker save stderr: {}".format(d_err_v))
 
-            if d_retval != 0:
-                errstr = """Could not save docker image {}. Retval {}
+                if d_retval != 0:
+                    errstr = """Could not save docker image {}. Retval {}
 ======
 STDERR
 ======
 {}""".format(
-                    dockerTag, d_retval, d_err_v
-                )
-
-                # Removing partial dumps
-                if os.path.exists(canonicalContainerPath):
-                    try:
-                        os.unlink(canonicalContainerPath)
-                    except:
-                        pass
-                raise ContainerEngineException(errstr)
+                        dockerTag, d_retval, d_err_v
+                    )
 
-            imageSignature = cast(
-                "Fingerprint", ComputeDigestFromFile(canonicalContainerPath)
-            )
+                    # Removing partial dumps
+                    if os.path.exists(canonicalContainerPath):
+                        try:
+                            os.unlink(canonicalContainerPath)
+                        except:
+                            pass
+                    raise ContainerEngineException(errstr)
 
-            # Last, save the metadata itself for further usage
-            with open(canonicalContainerPathMeta, mode="w", encoding="utf-8") as tcpM:
-                manifest_metadata: "DockerManifestMetadata" = {
-                    "image_id": image_id,
-                    "image_signature": imageSignature,
-                    "manifests_signature": manifestsImageSignature,
-                    "manifests": manifests,
-                }
-                json.dump(manifest_metadata, tcpM)
-
-            # Now, check the relative symbolic link of image
-            if os.path.lexists(localContainerPath):
-                os.unlink(localContainerPath)
-
-            os.symlink(
-                os.path.relpath(
-                    canonicalContainerPath, self.engineContainersSymlinkDir
-                ),
-                localContainerPath,
-            )
+                imageSignature = cast(
+                    "Fingerprint", ComputeDigestFromFile(canonicalContainerPath)
+                )
 
-            # Now, check the relative symbolic link of metadata
-            if os.path.lexists(localContainerPathMeta):
-                os.unlink(localContainerPathMeta)
-            os.symlink(
-                os.path.relpath(
-                    canonicalContainerPathMeta, self.engineContainersSymlinkDir
-                ),
-                localContainerPathMeta,
-            )
+                # Last, save the metadata itself for further usage
+                with open(
+                    canonicalContainerPathMeta, mode="w", encoding="utf-8"
+                ) as tcpM:
+                    manifest_metadata: "DockerManifestMetadata" = {
+                        "image_id": image_id,
+                        "image_signature": imageSignature,
+                        "manifests_signature": manifestsImageSignature,
+                        "manifests": manifests,
+                    }
+                    json.dump(manifest_metadata, tcpM)
+
+                self._linkCanonicalCopy(
+                    cast("AbsPath", canonicalContainerPath),
+                    localContainerPath,
+                    localContainerPathMeta,
+                )
 
         assert manifestsImageSignature is not None
         assert manifests is not None
@@ -500,6 +703,66 @@ STDERR
             image_signature=imageSignature,
         )
 
+    def deployContainers(
+        self,
+        containers_list: "Sequence[Container]",
+        simpleFileNameMethod: "ContainerFileNamingMethod",
+        containers_dir: "Optional[AnyPath]" = None,
+        force: "bool" = False,
+    ) -> "Sequence[Container]":
+        """
+        It is assured the containers are properly deployed. All of them
+        are inspected at once, instead of one docker call per container
+        """
+        redeployed_containers: "MutableSequence[Container]" = []
+
+        if containers_dir is None:
+            containers_dir = self.stagedContainersDir
+
+        accepted_containers = [
+            container
+            for container in containers_list
+            if self.AcceptsContainer(container)
+        ]
+
+        # When some image is not available yet, docker inspect fails,
+        # and the answer cannot be aligned with the tags. In that case
+        # each container is inspected on its own.
+        # Cached answers are not used here, as the images could have
+        # been removed or retagged by other processes in the meantime
+        ins_manifests_list: "Sequence[Optional[Sequence[DockerLikeManifest]]]" = [
+            None
+        ] * len(accepted_containers)
+        if len(accepted_containers) > 1:
+            matEnv = self.materialization_environment
+            d_retval, d_out_v, _ = self._inspect(
+                [container.taggedName for container in accepted_containers], matEnv
+            )
+            if d_retval == 0:
+                try:
+                    all_manifests = json_loads(d_out_v)
+                    if isinstance(all_manifests, list) and len(all_manifests) == len(
+                        accepted_containers
+                    ):
+                        ins_manifests_list = [[manifest] for manifest in all_manifests]
+                except json.JSONDecodeError as jde:
+                    self.logger.debug(
+                        f"Unparsable answer from batched docker inspect: {jde}"
+                    )
+
+        for container, ins_manifests in zip(accepted_containers, ins_manifests_list):
+            was_redeployed = self._deploySingleContainer(
+                container,
+                simpleFileNameMethod,
+                containers_dir=containers_dir,
+                force=force,
+                ins_manifests=ins_manifests,
+            )
+            if was_redeployed:
+                redeployed_containers.append(container)
+
+        return redeployed_containers
+
     def deploySingleContainer(
         self,
         container: "Container",
@@ -507,9 +770,27 @@ STDERR
         containers_dir: "Optional[AnyPath]" = None,
         force: "bool" = False,
     ) -> "bool":
+        return self._deploySingleContainer(
+            container,
+            simpleFileNameMethod,
+            containers_dir=containers_dir,
+            force=force,
+        )
+
+    def _deploySingleContainer(
+        self,
+        container: "Container",
+        simpleFileNameMethod: "ContainerFileNamingMethod",
+        containers_dir: "Optional[AnyPath]" = None,
+        force: "bool" = False,
+        ins_manifests: "Optional[Sequence[DockerLikeManifest]]" = None,
+    ) -> "bool":
+        """
+        ins_manifests, when provided, is the already gathered
+        answer from docker inspect for this container
+        """
         # Should we load the image?
-        matEnv = dict(os.environ)
-        matEnv.update(self.environment)
+        matEnv = self.materialization_environment
         dockerTag = container.taggedName
         tag_name = container.origTaggedName
 
@@ -545,11 +826,12 @@ STDERR
             self.logger.exception(errmsg)
             raise ContainerFactoryException(errmsg)
 
-        d_retval, d_out_v, d_err_v = self._inspect(dockerTag, matEnv)
-        #        d_retval, d_out_v, d_err_v = self._images(matEnv)
+        if ins_manifests is None:
+            d_retval, d_out_v, d_err_v = self._inspect(dockerTag, matEnv)
+            #        d_retval, d_out_v, d_err_v = self._images(matEnv)
 
-        if d_retval not in (0, 125):
-            errstr = """Could not inspect docker image {}. Retval {}
+            if d_retval not in (0, 125):
+                errstr = """Could not inspect docker image {}. Retval {}
 ======
 STDOUT
 ======
@@ -559,17 +841,17 @@ STDOUT
 STDERR
 ======
 {}""".format(
-                dockerTag, d_retval, d_out_v, d_err_v
-            )
-            raise ContainerEngineException(errstr)
+                    dockerTag, d_retval, d_out_v, d_err_v
+                )
+                raise ContainerEngineException(errstr)
 
-        # Parsing the output from docker inspect
-        try:
-            ins_manifests = json.loads(d_out_v)
-        except Exception as e:
-            errmsg = f"FATAL ERROR: Docker inspect finished properly but it did not properly answered for {tag_name}"
-            self.logger.exception(errmsg)
-            raise ContainerFactoryException(errmsg) from e
+            # Parsing the output from docker inspect
+            try:
+                ins_manifests = json_loads(d_out_v)
+            except Exception as e:
+                errmsg = f"FATAL ERROR: Docker inspect finished properly but it did not properly answered for {tag_name}"
+                self.logger.exception(errmsg)
+                raise ContainerFactoryException(errmsg) from e
 
         # Let's load then
         do_redeploy = manifestsImageSignature != self._gen_trimmed_manifests_signature(
@@ -20,7 +20,6 @@ from __future__ import absolute_import
 import os
 import sys
 import tempfile
-import atexit
 import shutil
 import time
 import abc
@@ -98,7 +97,11 @@ from .singularity_container import SingularityContainerFactory
 from .docker_container import DockerContainerFactory
 from .podman_container import PodmanContainerFactory
 
-from .utils.contents import CWLDesc2Content, GetGeneratedDirectoryContent
+from .utils.contents import (
+    CWLDesc2Content,
+    GetGeneratedDirectoryContent,
+    register_tempdir_cleanup,
+)
 from .utils.digests import ComputeDigestFromFile, nihDigester
 
 # Constants
@@ -314,6 +317,10 @@ CONTAINER_FACTORY_CLASSES: "Sequence[Type[ContainerFactory]]" = [
 
 
 class WorkflowEngine(AbstractWorkflowEngineType):
+    # Shell-style patterns of file names which usually betray a workflow
+    # for this engine. They only decide the order engines are probed
+    HINT_FILE_PATTERNS: "Sequence[str]" = tuple()
+
     def __init__(
         self,
         container_type: "ContainerType" = ContainerType.NoContainer,
@@ -377,7 +384,7 @@ class WorkflowEngine(AbstractWorkflowEngineType):
                 "AbsPath", tempfile.mkdtemp(prefix="WfExS", suffix="backend")
             )
             # Assuring this temporal directory is removed at the end
-            atexit.register(shutil.rmtree, cacheDir)
+            register_tempdir_cleanup(cacheDir)
         else:
             if not os.path.isabs(cacheDir):
                 cacheDir = cast(
@@ -412,7 +419,7 @@ class WorkflowEngine(AbstractWorkflowEngineType):
                 "AbsPath", tempfile.mkdtemp(prefix="WfExS-exec", suffix="workdir")
             )
             # Assuring this temporal directory is removed at the end
-            atexit.register(shutil.rmtree, workDir)
+            register_tempdir_cleanup(workDir)
         self.workDir = workDir
 
         # This directory should hold intermediate workflow steps results
@@ -468,7 +475,7 @@ class WorkflowEngine(AbstractWorkflowEngineType):
                 "AbsPath", tempfile.mkdtemp(prefix="WfExS-exec", suffix="tempdir")
             )
             # Assuring this temporal directory is removed at the end
-            atexit.register(shutil.rmtree, tempDir)
+            register_tempdir_cleanup(tempDir)
         self.tempDir = tempDir
 
         # This directory will hold the staged containers to be used
@@ -16,9 +16,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import atexit
-import hashlib
 import os
+import re
 import shutil
 import subprocess
 import tempfile
@@ -36,6 +35,7 @@ if TYPE_CHECKING:
         MutableMapping,
         MutableSequence,
         Optional,
+        Pattern,
         Tuple,
         Type,
         Union,
@@ -64,9 +64,10 @@ if TYPE_CHECKING:
     )
 
 
-from urllib import parse, request
+from urllib import parse
 
 import dulwich.porcelain
+import urllib3
 
 from . import (
     AbstractRepoFetcher,
@@ -74,6 +75,10 @@ from . import (
     ProtocolFetcherReturn,
     RepoGuessException,
 )
+from .http import (
+    HTTP_MAX_REDIRECTS,
+    get_pool_manager,
+)
 
 from ..common import (
     ContentKind,
@@ -83,7 +88,11 @@ from ..common import (
     URIWithMetadata,
 )
 
-from ..utils.contents import link_or_copy
+from ..utils.contents import (
+    link_or_copy,
+    register_tempdir_cleanup,
+)
+from ..utils.digests import hashed_id_from_string
 
 GITHUB_NETLOC = "github.com"
 
@@ -93,6 +102,8 @@ class GitFetcher(AbstractRepoFetcher):
     GIT_PROTO_PREFIX: "Final[str]" = GIT_PROTO + "+"
     GITHUB_SCHEME: "Final[str]" = "github"
     DEFAULT_GIT_CMD: "Final[SymbolicName]" = cast("SymbolicName", "git")
+    # Abbreviated or full commit hashes (either SHA-1 or SHA-256 ones)
+    GIT_COMMIT_PAT: "Final[Pattern[str]]" = re.compile(r"^[0-9a-f]{7,64}$")
 
     def __init__(
         self, progs: "ProgsMapping", setup_block: "Optional[Mapping[str, Any]]" = None
@@ -102,6 +113,10 @@ class GitFetcher(AbstractRepoFetcher):
         self.git_cmd = self.progs.get(
             self.DEFAULT_GIT_CMD, cast("RelPath", self.DEFAULT_GIT_CMD)
         )
+        # Setup key 'shallow-clone' (within the 'git' block of
+        # 'fetchers-setup'), which is enabled by default. When disabled,
+        # repositories are always fully cloned
+        self.shallow_clone = self.setup_block.get("shallow-clone", True)
 
     @classmethod
     def GetSchemeHandlers(cls) -> "Mapping[str, Type[AbstractStatefulFetcher]]":
@@ -146,24 +161,23 @@ class GitFetcher(AbstractRepoFetcher):
                 repo_tag_destdir = cast(
                     "AbsPath", tempfile.mkdtemp(prefix="wfexs", suffix=".git")
                 )
-                atexit.register(shutil.rmtree, repo_tag_destdir)
+                register_tempdir_cleanup(repo_tag_destdir)
             else:
-                repo_hashed_id = hashlib.sha1(repoURL.encode("utf-8")).hexdigest()
+                repo_hashed_id = hashed_id_from_string(repoURL)
                 repo_destdir = os.path.join(base_repo_destdir, repo_hashed_id)
                 # repo_destdir = os.path.join(self.cacheWorkflowDir, repo_hashed_id)
 
-                if not os.path.exists(repo_destdir):
-                    try:
-                        os.makedirs(repo_destdir)
-                    except IOError:
-                        errstr = "ERROR: Unable to create intermediate directories for repo {}. ".format(
-                            repoURL
-                        )
-                        raise FetcherException(errstr)
+                try:
+                    os.makedirs(repo_destdir, exist_ok=True)
+                except IOError:
+                    errstr = "ERROR: Unable to create intermediate directories for repo {}. ".format(
+                        repoURL
+                    )
+                    raise FetcherException(errstr)
 
-                repo_hashed_tag_id = hashlib.sha1(
-                    b"" if repoTag is None else repoTag.encode("utf-8")
-                ).hexdigest()
+                repo_hashed_tag_id = hashed_id_from_string(
+                    "" if repoTag is None else repoTag
+                )
                 repo_tag_destdir = cast(
                     "AbsPath", os.path.join(repo_destdir, repo_hashed_tag_id)
                 )
@@ -172,6 +186,7 @@ class GitFetcher(AbstractRepoFetcher):
 
         # We are assuming that, if the directory does exist, it contains the repo
         doRepoUpdate = True
+        gitclone_fallback_params: "Optional[Sequence[str]]" = None
         if not os.path.exists(os.path.join(repo_tag_destdir, ".git")):
             # Try cloning the repository without initial checkout
             if repoTag is not None:
@@ -186,6 +201,29 @@ class GitFetcher(AbstractRepoFetcher):
 
                 # Now, checkout the specific commit
                 gitcheckout_params = [self.git_cmd, "checkout", repoTag]
+
+                # Commits cannot be shallow cloned, so it is only tried
+                # when the tag does not look like a commit hash
+                if self.shallow_clone and self.GIT_COMMIT_PAT.search(repoTag) is None:
+                    # Only the tree of the branch or tag is fetched,
+                    # also for the submodules. When it fails (for
+                    # instance, a branch or tag which is not there,
+                    # or a submodule commit which cannot be fetched
+                    # on its own), the full clone is kept as fallback
+                    gitclone_fallback_params = gitclone_params
+                    gitclone_params = [
+                        self.git_cmd,
+                        "clone",
+                        "--depth",
+                        "1",
+                        "--single-branch",
+                        "--branch",
+                        repoTag,
+                        "--recurse-submodules",
+                        "--shallow-submodules",
+                        repoURL,
+                        repo_tag_destdir,
+                    ]
             else:
                 # We know nothing about the tag, or checkout
                 gitclone_params = [
@@ -206,69 +244,99 @@ class GitFetcher(AbstractRepoFetcher):
             doRepoUpdate = False
 
         if doRepoUpdate:
-            with tempfile.NamedTemporaryFile() as git_stdout, tempfile.NamedTemporaryFile() as git_stderr:
-                # First, (bare) clone
-                retval = 0
-                if gitclone_params is not None:
-                    self.logger.debug(f'Running "{" ".join(gitclone_params)}"')
-                    retval = subprocess.call(
-                        gitclone_params, stdout=git_stdout, stderr=git_stderr
-                    )
-                # Then, checkout (which can be optional)
-                if retval == 0 and (gitcheckout_params is not None):
-                    self.logger.debug(f'Running "{" ".join(gitcheckout_params)}"')
-                    retval = subprocess.Popen(
-                        gitcheckout_params,
-                        stdout=git_stdout,
-                        stderr=git_stderr,
-                        cwd=repo_tag_destdir,
-                    ).wait()
-                # Last, submodule preparation
-                if retval == 0:
-                    # Last, initialize submodules
-                    gitsubmodule_params = [
-                        self.git_cmd,
-                        "submodule",
-                        "update",
-                        "--init",
-                        "--recursive",
-                    ]
+            # Outputs are kept in memory, as they are only needed
+            # for the report
+            git_stdout_l: "MutableSequence[bytes]" = []
+            git_stderr_l: "MutableSequence[bytes]" = []
+
+            # First, (bare) clone
+            retval = 0
+            if gitclone_params is not None:
+                self.logger.debug(f'Running "{" ".join(gitclone_params)}"')
+                gitclone = subprocess.run(gitclone_params, capture_output=True)
+                git_stdout_l.append(gitclone.stdout)
+                git_stderr_l.append(gitclone.stderr)
+                retval = gitclone.returncode
+                if gitclone_fallback_params is not None:
+                    if retval == 0:
+                        # The shallow clone is already at the tag
+                        gitcheckout_params = None
+                    else:
+                        self.logger.debug(
+                            f"Shallow clone of {repoURL} (tag {repoTag}) failed. Trying a full one"
+                        )
+                        self.logger.debug(
+                            f'Running "{" ".join(gitclone_fallback_params)}"'
+                        )
+                        gitclone = subprocess.run(
+                            gitclone_fallback_params, capture_output=True
+                        )
+                        git_stdout_l.append(gitclone.stdout)
+                        git_stderr_l.append(gitclone.stderr)
+                        retval = gitclone.returncode
+            # Then, checkout (which can be optional)
+            if retval == 0 and (gitcheckout_params is not None):
+                self.logger.debug(f'Running "{" ".join(gitcheckout_params)}"')
+                gitcheckout = subprocess.run(
+                    gitcheckout_params,
+                    capture_output=True,
+                    cwd=repo_tag_destdir,
+                )
+                git_stdout_l.append(gitcheckout.stdout)
+                git_stderr_l.append(gitcheckout.stderr)
+                retval = gitcheckout.returncode
+            # Last, submodule preparation
+            if retval == 0:
+                # Last, initialize submodules
+                gitsubmodule_params = [
+                    self.git_cmd,
+                    "submodule",
+                    "update",
+                    "--init",
+                    "--recursive",
+                ]
 
-                    self.logger.debug(f'Running "{" ".join(gitsubmodule_params)}"')
-                    retval = subprocess.Popen(
-                        gitsubmodule_params,
-                        stdout=git_stdout,
-                        stderr=git_stderr,
-                        cwd=repo_tag_destdir,
-                    ).wait()
-
-                # Proper error handling
-                if retval != 0:
-                    # Reading the output and error for the report
-                    with open(git_stdout.name, "r") as c_stF:
-                        git_stdout_v = c_stF.read()
-                    with open(git_stderr.name, "r") as c_stF:
-                        git_stderr_v = c_stF.read()
-
-                    errstr = "ERROR: Unable to pull '{}' (tag '{}'). Retval {}\n======\nSTDOUT\n======\n{}\n======\nSTDERR\n======\n{}".format(
-                        repoURL, repoTag, retval, git_stdout_v, git_stderr_v
-                    )
-                    raise FetcherException(errstr)
+                self.logger.debug(f'Running "{" ".join(gitsubmodule_params)}"')
+                gitsubmodule = subprocess.run(
+                    gitsubmodule_params,
+                    capture_output=True,
+                    cwd=repo_tag_destdir,
+                )
+                git_stdout_l.append(gitsubmodule.stdout)
+                git_stderr_l.append(gitsubmodule.stderr)
+                retval = gitsubmodule.returncode
+
+            # Proper error handling
+            if retval != 0:
+                errstr = "ERROR: Unable to pull '{}' (tag '{}'). Retval {}\n======\nSTDOUT\n======\n{}\n======\nSTDERR\n======\n{}".format(
+                    repoURL,
+                    repoTag,
+                    retval,
+                    b"".join(git_stdout_l).decode("utf-8", errors="replace"),
+                    b"".join(git_stderr_l).decode("utf-8", errors="replace"),
+                )
+                raise FetcherException(errstr)
 
         # Last, we have to obtain the effective checkout
         gitrevparse_params = [self.git_cmd, "rev-parse", "--verify", "HEAD"]
 
         self.logger.debug(f'Running "{" ".join(gitrevparse_params)}"')
-        with subprocess.Popen(
+        gitrevparse = subprocess.run(
             gitrevparse_params,
-            stdout=subprocess.PIPE,
+            capture_output=True,
             encoding="iso-8859-1",
             cwd=repo_tag_destdir,
-        ) as revproc:
-            if revproc.stdout is not None:
-                repo_effective_checkout = cast(
-                    "RepoTag", revproc.stdout.read().rstrip()
-                )
+        )
+        if gitrevparse.returncode != 0:
+            errstr = "ERROR: Unable to learn the checkout of '{}' (tag '{}'). Retval {}\n======\nSTDOUT\n======\n{}\n======\nSTDERR\n======\n{}".format(
+                repoURL,
+                repoTag,
+                gitrevparse.returncode,
+                gitrevparse.stdout,
+                gitrevparse.stderr,
+            )
+            raise FetcherException(errstr)
+        repo_effective_checkout = cast("RepoTag", gitrevparse.stdout.rstrip())
 
         repo_desc: "RepoDesc" = {
             "repo": repoURL,
@@ -695,34 +763,38 @@ def find_git_repo_in_uri(
         if repo_type is None:
             # Metadata is all we really need
             repo_type = RepoType.Raw
-            req = request.Request(remote_uri_anc, method="HEAD")
             try:
-                with request.urlopen(req) as resp:
-                    # Is it gitlab?
-                    if list(
-                        filter(
-                            lambda c: "gitlab" in c,
-                            resp.headers.get_all("Set-Cookie"),
-                        )
-                    ):
-                        repo_type = RepoType.Git
-                        guessed_repo_flavor = RepoGuessFlavor.GitLab
-                    elif list(
-                        filter(
-                            lambda c: GITHUB_NETLOC in c,
-                            resp.headers.get_all("Set-Cookie"),
-                        )
-                    ):
-                        repo_type = RepoType.Git
-                        guessed_repo_flavor = RepoGuessFlavor.GitHub
-                    elif list(
-                        filter(
-                            lambda c: "bitbucket" in c,
-                            resp.headers.get_all("X-View-Name"),
-                        )
-                    ):
-                        repo_type = RepoType.Git
-                        guessed_repo_flavor = RepoGuessFlavor.BitBucket
+                # The shared connection pool is reused
+                resp = get_pool_manager(remote_uri_anc).request(
+                    "HEAD",
+                    remote_uri_anc,
+                    retries=urllib3.Retry(redirect=HTTP_MAX_REDIRECTS),
+                )
+                # Is it gitlab?
+                if list(
+                    filter(
+                        lambda c: "gitlab" in c,
+                        resp.headers.getlist("Set-Cookie"),
+                    )
+                ):
+                    repo_type = RepoType.Git
+                    guessed_repo_flavor = RepoGuessFlavor.GitLab
+                elif list(
+                    filter(
+                        lambda c: GITHUB_NETLOC in c,
+                        resp.headers.getlist("Set-Cookie"),
+                    )
+                ):
+                    repo_type = RepoType.Git
+                    guessed_repo_flavor = RepoGuessFlavor.GitHub
+                elif list(
+                    filter(
+                        lambda c: "bitbucket" in c,
+                        resp.headers.getlist("X-View-Name"),
+                    )
+                ):
+                    repo_type = RepoType.Git
+                    guessed_repo_flavor = RepoGuessFlavor.BitBucket
             except Exception as e:
                 pass
 
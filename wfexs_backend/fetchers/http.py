@@ -17,9 +17,9 @@
 # limitations under the License.
 
 from __future__ import absolute_import
-import http.client
 
-import shutil
+import os
+import threading
 
 from typing import (
     cast,
@@ -42,9 +42,9 @@ if TYPE_CHECKING:
         Union,
     )
 
-    from _typeshed import SupportsRead
-    from ssl import SSLContext
-    from mypy_extensions import DefaultNamedArg
+    from typing_extensions import (
+        Final,
+    )
 
     from ..common import (
         AbsPath,
@@ -58,7 +58,8 @@ if TYPE_CHECKING:
     )
 
 from urllib import request, parse
-import urllib.error
+
+import urllib3
 
 from . import (
     AbstractStatefulFetcher,
@@ -69,30 +70,53 @@ from . import (
 
 from ..common import (
     ContentKind,
+    create_augmented_context,
     URIWithMetadata,
 )
 
+# Connections are pooled, so consecutive requests to the same server
+# (metadata first, then contents) reuse the already open socket.
+# Redirections are followed by hand, in order to learn the final URL
+HTTP_MAX_REDIRECTS: "Final[int]" = 10
+# Multi-megabyte downloads are copied in 1 MiB chunks
+HTTP_DOWNLOAD_BUFFER_SIZE: "Final[int]" = 1 << 20
+# Downloads cut in the middle are resumed through range requests,
+# provided the server supports them
+HTTP_MAX_RESUMES: "Final[int]" = 5
+HTTP_POOL_PARAMS: "Final[Mapping[str, Any]]" = {
+    "num_pools": 16,
+    "maxsize": 10,
+    "retries": urllib3.Retry(total=3, redirect=False, backoff_factor=0.1),
+    "ssl_context": create_augmented_context(),
+}
+HTTP_POOL_MANAGER: "Final[urllib3.PoolManager]" = urllib3.PoolManager(
+    **HTTP_POOL_PARAMS
+)
 
-def get_opener_with_auth(
-    top_level_url: "str", username: "str", password: "str"
-) -> "request.OpenerDirector":
-    """
-    Taken from https://stackoverflow.com/a/44239906
-    """
+# Proxies declared in the environment are honoured, as urllib did
+_PROXY_MANAGERS: "MutableMapping[str, urllib3.ProxyManager]" = {}
+_PROXY_MANAGERS_LOCK: "Final[threading.Lock]" = threading.Lock()
 
-    # create a password manager
-    password_mgr = request.HTTPPasswordMgrWithPriorAuth()
 
-    # Add the username and password.
-    # If we knew the realm, we could use it instead of None.
-    password_mgr.add_password(
-        None, top_level_url, username, password, is_authenticated=True
-    )
+def get_pool_manager(remote_file: "str") -> "urllib3.PoolManager":
+    """
+    It returns the shared pool manager to be used to reach the URL,
+    taking into account the proxies set up in the environment
+    """
+    parsed_url = parse.urlparse(remote_file)
+    proxy_url = request.getproxies().get(parsed_url.scheme)
+    if proxy_url is None or (
+        parsed_url.hostname is not None and request.proxy_bypass(parsed_url.hostname)
+    ):
+        return HTTP_POOL_MANAGER
 
-    handler = request.HTTPBasicAuthHandler(password_mgr)
+    with _PROXY_MANAGERS_LOCK:
+        proxy_manager = _PROXY_MANAGERS.get(proxy_url)
+        if proxy_manager is None:
+            proxy_manager = urllib3.ProxyManager(proxy_url, **HTTP_POOL_PARAMS)
+            _PROXY_MANAGERS[proxy_url] = proxy_manager
 
-    # create "opener" (OpenerDirector instance)
-    return request.build_opener(handler)
+    return proxy_manager
 
 
 def fetchClassicURL(
@@ -135,20 +159,23 @@ def fetchClassicURL(
         token = None
         token_header = None
 
-    # Callable[[Union[str, Request], Union[bytes, SupportsRead[bytes], Iterable[bytes], None], Optional[float]], Any]
-    # Callable[[Union[str, Request], Optional[Union[bytes, SupportsRead[bytes], Iterable[bytes], None]], Optional[float], DefaultNamedArg(Optional[str], 'cafile'), DefaultNamedArg(Optional[str], 'capath'), DefaultNamedArg(bool, 'cadefault'), DefaultNamedArg(Optional[SSLContext], 'context')], Any]
-    opener: "Union[Callable[[Union[str, request.Request], Union[bytes, SupportsRead[bytes], Iterable[bytes], None], Optional[float]], Any], Callable[[Union[str, request.Request], Optional[Union[bytes, SupportsRead[bytes], Iterable[bytes]]], Optional[float], DefaultNamedArg(Optional[str], 'cafile'), DefaultNamedArg(Optional[str], 'capath'), DefaultNamedArg(bool, 'cadefault'), DefaultNamedArg(Optional[SSLContext], 'context')], Any]]"
-    opener = request.urlopen
+    # Headers derived from the credentials, which are not handed to
+    # other servers on redirections
+    credential_headers: "MutableSequence[str]" = ["authorization"]
     if token is not None:
         if token_header is not None:
             headers[token_header] = token
+            credential_headers.append(token_header.lower())
         else:
             headers["Authorization"] = f"Bearer {token}"
     elif username is not None:
         if password is None:
             password = ""
 
-        opener = get_opener_with_auth(remote_file, username, password).open
+        # Credentials are sent from the very first request
+        auth_headers = urllib3.util.make_headers(basic_auth=f"{username}:{password}")
+        headers.update(auth_headers)
+        credential_headers.extend(h_key.lower() for h_key in auth_headers.keys())
 
         # # Time to set up user and password in URL
         # parsedInputURL = parse.urlparse(remote_file)
@@ -169,38 +196,132 @@ def fetchClassicURL(
     else:
         download_file = cachedFilename
 
+    if method is None:
+        method = "GET" if data is None else "POST"
+
     uri_with_metadata = None
+    fetched = False
     try:
-        req_remote = request.Request(
-            remote_file, headers=headers, data=data, method=method
-        )
-        with opener(req_remote) as url_response:
+        http_manager = get_pool_manager(remote_file)
+        the_uri = remote_file
+        for _ in range(HTTP_MAX_REDIRECTS + 1):
+            url_response = http_manager.request(
+                method,
+                the_uri,
+                body=data,
+                headers=headers,
+                redirect=False,
+                preload_content=False,
+                decode_content=False,
+                enforce_content_length=True,
+            )
+            redirect_location = url_response.get_redirect_location()
+            if not redirect_location:
+                break
+
+            # Same rules as urllib about how to follow a redirection
+            url_response.drain_conn()
+            url_response.release_conn()
+            next_uri = cast("URIType", parse.urljoin(the_uri, redirect_location))
+            if url_response.status in (301, 302, 303) and method not in (
+                "GET",
+                "HEAD",
+            ):
+                method = "GET"
+                data = None
+            if parse.urlparse(next_uri).netloc != parse.urlparse(the_uri).netloc:
+                # Credentials are not handed to other servers
+                headers = {
+                    h_key: h_val
+                    for h_key, h_val in headers.items()
+                    if h_key.lower() not in credential_headers
+                }
+                http_manager = get_pool_manager(next_uri)
+            the_uri = next_uri
+        else:
+            raise FetcherException(
+                f"Error fetching {orig_remote_file} : too many redirections"
+            )
+
+        try:
+            if url_response.status >= 400:
+                raise FetcherException(
+                    "Error fetching {} : {} {}\n{}".format(
+                        orig_remote_file,
+                        url_response.status,
+                        url_response.reason,
+                        url_response.read().decode("utf-8", errors="replace"),
+                    ),
+                    code=url_response.status,
+                    reason=url_response.reason,
+                )
+
             uri_with_metadata = URIWithMetadata(
-                uri=url_response.url, metadata=dict(url_response.headers.items())
+                uri=the_uri, metadata=dict(url_response.headers.items())
             )
 
+            # Servers announce whether they support range requests
+            resumable = (
+                method == "GET" and url_response.headers.get("Accept-Ranges") == "bytes"
+            )
+            written = 0
+            resumes = 0
             while True:
                 try:
-                    # Try getting it
-                    shutil.copyfileobj(url_response, download_file)
-                except http.client.IncompleteRead as icread:
-                    download_file.write(icread.partial)
-                    # Restarting the copy
-                    continue
-                break
-
-    except urllib.error.HTTPError as he:
+                    for chunk in url_response.stream(
+                        HTTP_DOWNLOAD_BUFFER_SIZE, decode_content=False
+                    ):
+                        download_file.write(chunk)
+                        written += len(chunk)
+                    break
+                except urllib3.exceptions.ProtocolError as pe:
+                    # The connection was broken in the middle of the
+                    # transfer. As urllib used to do on IncompleteRead,
+                    # the download goes on, but through a range request
+                    if not resumable or resumes >= HTTP_MAX_RESUMES:
+                        raise
+                    resumes += 1
+                    url_response.release_conn()
+                    url_response = http_manager.request(
+                        method,
+                        the_uri,
+                        headers={**headers, "Range": f"bytes={written}-"},
+                        redirect=False,
+                        preload_content=False,
+                        decode_content=False,
+                        enforce_content_length=True,
+                    )
+                    content_range = url_response.headers.get("Content-Range", "")
+                    if url_response.status != 206 or not content_range.startswith(
+                        f"bytes {written}-"
+                    ):
+                        raise FetcherException(
+                            "Error resuming {} from byte {} : {} {}".format(
+                                orig_remote_file,
+                                written,
+                                url_response.status,
+                                url_response.reason,
+                            ),
+                            code=url_response.status,
+                            reason=url_response.reason,
+                        ) from pe
+            fetched = True
+        finally:
+            url_response.release_conn()
+    except urllib3.exceptions.HTTPError as he:
         raise FetcherException(
-            "Error fetching {} : {} {}\n{}".format(
-                orig_remote_file, he.code, he.reason, he.read().decode()
-            ),
-            code=he.code,
-            reason=he.reason,
+            "Error fetching {} : {}".format(orig_remote_file, he)
         ) from he
     finally:
         # Closing files opened by this code
         if download_file != cachedFilename:
             download_file.close()
+            # A truncated download should not be left behind
+            if not fetched and isinstance(cachedFilename, str):
+                try:
+                    os.unlink(cachedFilename)
+                except OSError:
+                    pass
 
     return ProtocolFetcherReturn(
         kind_or_resolved=ContentKind.File,
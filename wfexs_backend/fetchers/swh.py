@@ -17,7 +17,6 @@
 # limitations under the License.
 
 import atexit
-import hashlib
 import io
 import json
 import os
@@ -82,7 +81,11 @@ from ..common import (
     URIWithMetadata,
 )
 
-from ..utils.contents import link_or_copy
+from ..utils.contents import (
+    link_or_copy,
+    register_tempdir_cleanup,
+)
+from ..utils.digests import hashed_id_from_string
 
 
 class SoftwareHeritageFetcher(AbstractRepoFetcher):
@@ -330,28 +333,25 @@ class SoftwareHeritageFetcher(AbstractRepoFetcher):
                                 "AbsPath",
                                 tempfile.mkdtemp(prefix="wfexs", suffix=".swh"),
                             )
-                            atexit.register(shutil.rmtree, repo_tag_destdir)
+                            register_tempdir_cleanup(repo_tag_destdir)
                         else:
-                            repo_hashed_id = hashlib.sha1(
-                                repoURL.encode("utf-8")
-                            ).hexdigest()
+                            repo_hashed_id = hashed_id_from_string(repoURL)
                             repo_destdir = os.path.join(
                                 base_repo_destdir, repo_hashed_id
                             )
                             # repo_destdir = os.path.join(self.cacheWorkflowDir, repo_hashed_id)
 
-                            if not os.path.exists(repo_destdir):
-                                try:
-                                    os.makedirs(repo_destdir)
-                                except IOError:
-                                    errstr = "ERROR: Unable to create intermediate directories for repo {}. ".format(
-                                        repoURL
-                                    )
-                                    raise FetcherException(errstr)
-
-                            repo_hashed_tag_id = hashlib.sha1(
-                                b"" if repoTag is None else repoTag.encode("utf-8")
-                            ).hexdigest()
+                            try:
+                                os.makedirs(repo_destdir, exist_ok=True)
+                            except IOError:
+                                errstr = "ERROR: Unable to create intermediate directories for repo {}. ".format(
+                                    repoURL
+                                )
+                                raise FetcherException(errstr)
+
+                            repo_hashed_tag_id = hashed_id_from_string(
+                                "" if repoTag is None else repoTag
+                            )
                             repo_tag_destdir = cast(
                                 "AbsPath",
                                 os.path.join(repo_destdir, repo_hashed_tag_id),
@@ -359,7 +359,7 @@ class SoftwareHeritageFetcher(AbstractRepoFetcher):
 
                     # These steps are needed because the bundle has its contents in the parent
                     extract_dir = tempfile.mkdtemp(prefix="wfexs", suffix=".swh")
-                    atexit.register(shutil.rmtree, extract_dir)
+                    register_tempdir_cleanup(extract_dir)
                     with tarfile.open(
                         tmp_targz_filename.name, mode="r|*", bufsize=10 * 1024 * 1024
                     ) as tF:
@@ -430,22 +430,21 @@ class SoftwareHeritageFetcher(AbstractRepoFetcher):
                     repo_tag_destfile = os.fdopen(temp_file_descriptor, mode="wb")
                     atexit.register(os.unlink, repo_tag_destdir)
                 else:
-                    repo_hashed_id = hashlib.sha1(repoURL.encode("utf-8")).hexdigest()
+                    repo_hashed_id = hashed_id_from_string(repoURL)
                     repo_destdir = os.path.join(base_repo_destdir, repo_hashed_id)
                     # repo_destdir = os.path.join(self.cacheWorkflowDir, repo_hashed_id)
 
-                    if not os.path.exists(repo_destdir):
-                        try:
-                            os.makedirs(repo_destdir)
-                        except IOError:
-                            errstr = "ERROR: Unable to create intermediate directories for repo {}. ".format(
-                                repoURL
-                            )
-                            raise FetcherException(errstr)
+                    try:
+                        os.makedirs(repo_destdir, exist_ok=True)
+                    except IOError:
+                        errstr = "ERROR: Unable to create intermediate directories for repo {}. ".format(
+                            repoURL
+                        )
+                        raise FetcherException(errstr)
 
-                    repo_hashed_tag_id = hashlib.sha1(
-                        b"" if repoTag is None else repoTag.encode("utf-8")
-                    ).hexdigest()
+                    repo_hashed_tag_id = hashed_id_from_string(
+                        "" if repoTag is None else repoTag
+                    )
                     repo_tag_destdir = cast(
                         "AbsPath", os.path.join(repo_destdir, repo_hashed_tag_id)
                     )
@@ -147,6 +147,8 @@ class NextflowWorkflowEngine(WorkflowEngine):
 
     NEXTFLOW_IO = cast("URIType", "https://www.nextflow.io/")
 
+    HINT_FILE_PATTERNS = (NEXTFLOW_CONFIG_FILENAME, "*.nf")
+
     DEFAULT_MAX_RETRIES = 5
     DEFAULT_MAX_CPUS = 4
 
@@ -298,7 +300,9 @@ class NextflowWorkflowEngine(WorkflowEngine):
         os.makedirs(self.groovy_cache_dir, exist_ok=True)
 
     @classmethod
+    @functools.lru_cache(maxsize=None)
     def MyWorkflowType(cls) -> "WorkflowType":
+        # The description is built only once per class
         # As of https://about.workflowhub.eu/Workflow-RO-Crate/ ,
         # the rocrate_programming_language should be next
         return WorkflowType(
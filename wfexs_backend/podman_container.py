@@ -75,6 +75,7 @@ from .utils.contents import (
     real_unlink_if_exists,
 )
 from .utils.digests import ComputeDigestFromFile
+from .utils.misc import json_loads
 
 
 class PodmanContainerFactory(AbstractDockerContainerFactory):
@@ -107,7 +108,7 @@ class PodmanContainerFactory(AbstractDockerContainerFactory):
         tools = local_config.get("tools", {}) if local_config else {}
         self.runtime_cmd = tools.get("podmanCommand", DEFAULT_PODMAN_CMD)
 
-        self._environment.update(
+        self._update_environment(
             {
                 "XDG_DATA_HOME": os.path.join(self.stagedContainersDir, ".podman"),
             }
@@ -176,8 +177,7 @@ STDERR
         It is assured the containers are materialized
         """
 
-        matEnv = dict(os.environ)
-        matEnv.update(self.environment)
+        matEnv = self.materialization_environment
 
         # It is an absolute URL, we are removing the docker://
         tag_name = tag.origTaggedName
@@ -398,7 +398,7 @@ STDERR
 
             # Parsing the output from podman inspect
             try:
-                manifests = cast("Sequence[Mapping[str, Any]]", json.loads(d_out_v))
+                manifests = cast("Sequence[Mapping[str, Any]]", json_loads(d_out_v))
                 manifest = manifests[0]
                 image_id = cast("Fingerprint", manifest["Id"])
             except Exception as e:
@@ -536,8 +536,7 @@ STDERR
         force: "bool" = False,
     ) -> "bool":
         # Should we load the image?
-        matEnv = dict(os.environ)
-        matEnv.update(self.environment)
+        matEnv = self.materialization_environment
         dockerTag = container.taggedName
         tag_name = container.origTaggedName
 
@@ -593,7 +592,7 @@ STDERR
 
         # Parsing the output from podman inspect
         try:
-            ins_manifests = json.loads(d_out_v)
+            ins_manifests = json_loads(d_out_v)
         except Exception as e:
             errmsg = f"FATAL ERROR: Podman inspect finished properly but it did not properly answered for {tag_name}"
             self.logger.exception(errmsg)
@@ -111,6 +111,12 @@ class SecurityContextVault(abc.ABC):
                 else:
                     creds_config_by_name[name_or_prefix] = sec_context
 
+        # Longest prefixes are tried first, so they are sorted only once
+        for sec_scheme, prefixes in creds_config_by_prefix.items():
+            creds_config_by_prefix[sec_scheme] = sorted(
+                prefixes, key=lambda val: (-len(val[0]), val[0])
+            )
+
         self._creds_config_by_name: "SecurityContextConfigBlock" = creds_config_by_name
         self._creds_config_by_prefix = creds_config_by_prefix
 
@@ -132,13 +138,11 @@ class SecurityContextVault(abc.ABC):
                 )
         # and the second one is a context by URI prefix
         elif len(self._creds_config_by_prefix) > 0:
+            # urlparse already returns the scheme in lowercase
             parsed_remote = urllib.parse.urlparse(remote_file)
-            parsed_remote_scheme = parsed_remote.scheme.lower()
-            prefixes = self._creds_config_by_prefix.get(parsed_remote_scheme)
+            prefixes = self._creds_config_by_prefix.get(parsed_remote.scheme)
             if isinstance(prefixes, list):
-                for prefix, a_sec_context in sorted(
-                    prefixes, key=lambda val: (-len(val[0]), val[0])
-                ):
+                for prefix, a_sec_context in prefixes:
                     if remote_file.startswith(prefix):
                         sec_context = a_sec_context
                         break
@@ -140,7 +140,7 @@ class SingularityContainerFactory(ContainerFactory):
         singularityCacheDir = os.path.join(self.stagedContainersDir, ".singularity")
         os.makedirs(singularityCacheDir, exist_ok=True)
 
-        self._environment.update(
+        self._update_environment(
             {
                 "APPTAINER_TMPDIR": self.tempDir,
                 "APPTAINER_CACHEDIR": singularityCacheDir,
@@ -153,8 +153,7 @@ class SingularityContainerFactory(ContainerFactory):
         # https://github.com/hpcng/singularity/issues/1445#issuecomment-381588444
         userns_supported = False
         if self.supportsFeature("host_userns"):
-            matEnv = dict(os.environ)
-            matEnv.update(self.environment)
+            matEnv = self.materialization_environment
             with tempfile.NamedTemporaryFile() as s_out, tempfile.NamedTemporaryFile() as s_err:
                 s_retval = subprocess.Popen(
                     [self.runtime_cmd, "exec", "--userns", "/etc", "true"],
@@ -166,8 +165,8 @@ class SingularityContainerFactory(ContainerFactory):
                 # The command always fails.
                 # We only need to find 'Failed to create user namespace'
                 # in order to discard this feature
-                with open(s_err.name, "r") as c_stF:
-                    s_err_v = c_stF.read()
+                s_err.seek(0)
+                s_err_v = s_err.read().decode("utf-8", errors="replace")
                 if "Failed to create user namespace" not in s_err_v:
                     userns_supported = True
                     self._features.add("userns")
@@ -206,10 +205,10 @@ class SingularityContainerFactory(ContainerFactory):
             self.logger.debug(f"singularity inspect retval: {s_retval}")
 
             if s_retval != 0:
-                with open(s_out.name, "r") as c_stF:
-                    s_out_v = c_stF.read()
-                with open(s_err.name, "r") as c_stF:
-                    s_err_v = c_stF.read()
+                s_out.seek(0)
+                s_out_v = s_out.read().decode("utf-8", errors="replace")
+                s_err.seek(0)
+                s_err_v = s_err.read().decode("utf-8", errors="replace")
                 errstr = """Could not inspect singularity image {}. Retval {}
 ======
 STDOUT
@@ -237,10 +236,10 @@ STDERR
 
             self.logger.debug(f"singularity sif list retval: {s_retval}")
 
-            with open(s_out.name, "r") as c_stF:
-                s_out_v = c_stF.read()
-            with open(s_err.name, "r") as c_stF:
-                s_err_v = c_stF.read()
+            s_out.seek(0)
+            s_out_v = s_out.read().decode("utf-8", errors="replace")
+            s_err.seek(0)
+            s_err_v = s_err.read().decode("utf-8", errors="replace")
 
             self.logger.debug(f"singularity sif list stdout: {s_out_v}")
 
@@ -308,10 +307,10 @@ STDERR
 
             self.logger.debug(f"singularity sif info retval: {s_retval}")
 
-            with open(s_out.name, "r") as c_stF:
-                s_out_v = c_stF.read()
-            with open(s_err.name, "r") as c_stF:
-                s_err_v = c_stF.read()
+            s_out.seek(0)
+            s_out_v = s_out.read().decode("utf-8", errors="replace")
+            s_err.seek(0)
+            s_err_v = s_err.read().decode("utf-8", errors="replace")
 
             self.logger.debug(f"singularity sif info stdout: {s_out_v}")
 
@@ -519,10 +518,10 @@ STDERR
 
                 self.logger.debug(f"singularity pull retval: {s_retval}")
 
-                with open(s_out.name, "r") as c_stF:
-                    s_out_v = c_stF.read()
-                with open(s_err.name, "r") as c_stF:
-                    s_err_v = c_stF.read()
+                s_out.seek(0)
+                s_out_v = s_out.read().decode("utf-8", errors="replace")
+                s_err.seek(0)
+                s_err_v = s_err.read().decode("utf-8", errors="replace")
 
                 self.logger.debug(f"singularity pull stdout: {s_out_v}")
 
@@ -770,8 +769,7 @@ STDERR
         if containers_dir is None:
             containers_dir = self.stagedContainersDir
 
-        matEnv = dict(os.environ)
-        matEnv.update(self.environment)
+        matEnv = self.materialization_environment
         dhelp = DockerHelper()
 
         for tag in tagList:
@@ -18,9 +18,13 @@
 
 from __future__ import absolute_import
 
+import atexit
 import logging
 import os
 import shutil
+import signal
+import sys
+import threading
 from typing import (
     cast,
     TYPE_CHECKING,
@@ -36,6 +40,10 @@ from ..common import (
 )
 
 if TYPE_CHECKING:
+    from types import (
+        FrameType,
+    )
+
     from typing import (
         Any,
         Mapping,
@@ -45,6 +53,10 @@ if TYPE_CHECKING:
         Union,
     )
 
+    from typing_extensions import (
+        Final,
+    )
+
     from ..common import (
         AbsPath,
         AbstractGeneratedContent,
@@ -340,6 +352,115 @@ def real_unlink_if_exists(the_path: "AnyPath", fail_ok: "bool" = False) -> "None
                 raise e
 
 
+# Temporary directories to be removed when the process exits.
+# A single atexit handler takes care of all of them, and SIGTERM is
+# translated into a regular exit, so they are also removed when the
+# process is terminated. Setting WFEXS_KEEP_TMP=1 keeps them, which
+# is useful for debugging purposes.
+_TEMP_DIRS_TO_CLEAN: "MutableSequence[str]" = []
+_TEMP_DIRS_LOCK = threading.Lock()
+_TEMP_DIRS_CLEANUP_INSTALLED = False
+
+
+# Number of threads used to remove large directory trees
+RMTREE_MAX_WORKERS: "Final[int]" = 8
+
+
+def _remove_path(the_path: "str") -> "None":
+    if os.path.isdir(the_path) and not os.path.islink(the_path):
+        shutil.rmtree(the_path, ignore_errors=True)
+    else:
+        try:
+            os.unlink(the_path)
+        except OSError:
+            pass
+
+
+def parallel_rmtree(root: "str", max_workers: "int" = RMTREE_MAX_WORKERS) -> "None":
+    """
+    Removes a directory tree, distributing its top level entries among
+    several threads, as unlinking lots of small files (for instance,
+    git repositories internals) is bound by syscall latency.
+    Errors are ignored, as it happens with shutil.rmtree(ignore_errors=True)
+    """
+    try:
+        children = [os.path.join(root, name) for name in os.listdir(root)]
+    except OSError:
+        children = []
+
+    if len(children) > 1 and max_workers > 1:
+        children_iter = iter(children)
+        children_lock = threading.Lock()
+
+        def _rmtree_worker() -> "None":
+            while True:
+                with children_lock:
+                    child = next(children_iter, None)
+                if child is None:
+                    break
+                try:
+                    _remove_path(child)
+                except Exception:
+                    # A failing subtree should not stop this worker,
+                    # and the serial pass below retries what is left
+                    pass
+
+        workers: "MutableSequence[threading.Thread]" = []
+        try:
+            for _ in range(min(max_workers, len(children))):
+                worker = threading.Thread(target=_rmtree_worker, daemon=True)
+                worker.start()
+                workers.append(worker)
+        except RuntimeError:
+            # Newer Python versions do not allow starting threads
+            # when the interpreter is shutting down, so the pending
+            # entries are removed by the serial pass below
+            pass
+
+        for worker in workers:
+            worker.join()
+
+    shutil.rmtree(root, ignore_errors=True)
+
+
+def _cleanup_tempdirs() -> "None":
+    if os.environ.get("WFEXS_KEEP_TMP") == "1":
+        return
+
+    with _TEMP_DIRS_LOCK:
+        # Last registered ones are removed first, as atexit would do
+        tempdirs = list(reversed(_TEMP_DIRS_TO_CLEAN))
+        _TEMP_DIRS_TO_CLEAN.clear()
+
+    for tempdir in tempdirs:
+        parallel_rmtree(tempdir)
+
+
+def _sigterm_to_exit(signum: "int", frame: "Optional[FrameType]") -> "None":
+    # Conventional exit status of a process killed by a signal
+    sys.exit(128 + signum)
+
+
+def register_tempdir_cleanup(tempdir: "str") -> "None":
+    """
+    The temporary directory will be removed when the process exits,
+    even when it is terminated through SIGTERM
+    """
+    global _TEMP_DIRS_CLEANUP_INSTALLED
+    with _TEMP_DIRS_LOCK:
+        _TEMP_DIRS_TO_CLEAN.append(tempdir)
+        if not _TEMP_DIRS_CLEANUP_INSTALLED:
+            _TEMP_DIRS_CLEANUP_INSTALLED = True
+            atexit.register(_cleanup_tempdirs)
+            # Signal handlers can only be installed from the main thread,
+            # and the ones set up by an embedding application are kept
+            if (
+                threading.current_thread() is threading.main_thread()
+                and signal.getsignal(signal.SIGTERM) == signal.SIG_DFL
+            ):
+                signal.signal(signal.SIGTERM, _sigterm_to_exit)
+
+
 def bin2dataurl(content: "bytes") -> "URIType":
     mime_type = magic.from_buffer(content, mime=True)
 
@@ -22,8 +22,10 @@ import base64
 import functools
 import hashlib
 import json
+import mmap
 import os
 import stat
+import threading
 from typing import (
     cast,
     TYPE_CHECKING,
@@ -36,6 +38,7 @@ if TYPE_CHECKING:
         IO,
         Iterator,
         Mapping,
+        MutableMapping,
         MutableSequence,
         Optional,
         Sequence,
@@ -44,6 +47,7 @@ if TYPE_CHECKING:
     )
 
     from typing_extensions import (
+        Final,
         Protocol,
         TypeAlias,
     )
@@ -73,6 +77,17 @@ DEFAULT_DIGEST_ALGORITHM = "sha256"
 DEFAULT_DIGEST_BUFFER_SIZE = 65536
 
 
+@functools.lru_cache(maxsize=4096)
+def hashed_id_from_string(the_string: "str") -> "str":
+    """
+    Short stable identifier used to name cache entries after URIs, tags
+    and similar strings. It must stay SHA-1, as existing caches use it.
+    Repeated strings (the same repository or URI over and over) are
+    answered from memory
+    """
+    return hashlib.sha1(the_string.encode("utf-8")).hexdigest()
+
+
 def stringifyDigest(digestAlgorithm: "str", digest: "bytes") -> "Fingerprint":
     return cast(
         "Fingerprint",
@@ -164,12 +179,22 @@ def ComputeDigestFromFileLike(
     return repMethod(digestAlgorithm, h.digest())
 
 
-@functools.lru_cache(maxsize=32)
+# Raw digests of regular files, keyed by device, inode and algorithm.
+# Each entry remembers the size and timestamps of the file when it was
+# digested, so a single stat tells whether the digest is still valid
+_FILE_DIGESTS: "MutableMapping[Tuple[int, int, str], Tuple[Tuple[int, int, int], bytes]]" = (
+    {}
+)
+_FILE_DIGESTS_MAXSIZE: "Final[int]" = 4096
+# Digests are computed from several threads
+_FILE_DIGESTS_LOCK: "Final[threading.Lock]" = threading.Lock()
+
+
 def ComputeDigestFromFile(
-    filename: "AnyPath",
+    filename: "str",
     digestAlgorithm: "str" = DEFAULT_DIGEST_ALGORITHM,
     bufferSize: "int" = DEFAULT_DIGEST_BUFFER_SIZE,
-    repMethod: "Union[FingerprintMethod, RawFingerprintMethod]" = stringifyDigest,
+    repMethod: "Optional[Union[FingerprintMethod, RawFingerprintMethod]]" = stringifyDigest,
 ) -> "Optional[Union[Fingerprint, bytes]]":
     """
     Accessory method used to compute the digest of an input file
@@ -180,7 +205,48 @@ def ComputeDigestFromFile(
         return None
 
     with open(filename, mode="rb") as f:
-        return ComputeDigestFromFileLike(f, digestAlgorithm, bufferSize, repMethod)
+        f_stat = os.fstat(f.fileno())
+        if not stat.S_ISREG(f_stat.st_mode):
+            return ComputeDigestFromFileLike(f, digestAlgorithm, bufferSize, repMethod)
+
+        digest_key = (f_stat.st_dev, f_stat.st_ino, digestAlgorithm)
+        stat_sig = (f_stat.st_size, f_stat.st_mtime_ns, f_stat.st_ctime_ns)
+        with _FILE_DIGESTS_LOCK:
+            memoized = _FILE_DIGESTS.get(digest_key)
+        if memoized is not None and memoized[0] == stat_sig:
+            return repMethod(digestAlgorithm, memoized[1])
+
+        # Regular files are digested through a read-only memory map,
+        # so their content is not copied into intermediate buffers
+        f_map: "Optional[mmap.mmap]" = None
+        if f_stat.st_size > 0:
+            try:
+                f_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                pass
+
+        if f_map is not None:
+            with f_map:
+                if hasattr(f_map, "madvise"):
+                    f_map.madvise(mmap.MADV_SEQUENTIAL)
+                h = hashlib.new(digestAlgorithm)
+                h.update(f_map)
+            digest = h.digest()
+        else:
+            digest = cast(
+                "bytes",
+                ComputeDigestFromFileLike(
+                    f, digestAlgorithm, bufferSize, nullProcessDigest
+                ),
+            )
+
+    with _FILE_DIGESTS_LOCK:
+        if len(_FILE_DIGESTS) >= _FILE_DIGESTS_MAXSIZE:
+            # Forgetting the oldest one
+            _FILE_DIGESTS.pop(next(iter(_FILE_DIGESTS)), None)
+        _FILE_DIGESTS[digest_key] = (stat_sig, digest)
+
+    return repMethod(digestAlgorithm, digest)
 
 
 def compute_sha1_git_from_stream(
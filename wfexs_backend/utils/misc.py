@@ -52,6 +52,21 @@ import jsonschema.validators
 
 from ..common import AbstractWfExSException
 
+# We have preference for orjson, which is faster and parses bytes
+# without decoding them first, but the code should fallback to the
+# standard implementation when it is not present.
+# orjson.JSONDecodeError is a subclass of json.JSONDecodeError
+try:
+    import orjson
+
+    def json_loads(payload: "Union[bytes, bytearray, str]") -> "Any":
+        return orjson.loads(payload)
+
+except ImportError:
+
+    def json_loads(payload: "Union[bytes, bytearray, str]") -> "Any":
+        return json.loads(payload)
+
 
 def translate_glob_args(
     args: "Union[Iterator[str], Sequence[str]]",
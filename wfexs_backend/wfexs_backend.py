@@ -17,10 +17,10 @@
 # limitations under the License.
 from __future__ import absolute_import
 
-import atexit
+import concurrent.futures
 import copy
 import datetime
-import hashlib
+import functools
 import inspect
 import io
 import json
@@ -32,10 +32,10 @@ import stat
 import subprocess
 import sys
 import tempfile
-import types
 import urllib.parse
 import uuid
 import warnings
+import zipfile
 
 from typing import (
     cast,
@@ -91,10 +91,13 @@ from .ro_crate import FixedROCrate
 
 from .security_context import SecurityContextVault
 
+from .utils.contents import register_tempdir_cleanup
+from .utils.digests import hashed_id_from_string
 from .utils.marshalling_handling import unmarshall_namedtuple
 from .utils.misc import config_validate
 from .utils.misc import (
     DatetimeEncoder,
+    json_loads,
     jsonFilterDecodeFromStream,
     translate_glob_args,
 )
@@ -242,6 +245,9 @@ class WfExSBackend:
 
     ID_JSON_FILENAME: "Final[str]" = ".id.json"
 
+    # Number of hosts batch downloads are concurrently talking to
+    MAX_PARALLEL_DOWNLOAD_HOSTS: "Final[int]" = 8
+
     SCHEMAS_REL_DIR: "Final[str]" = "schemas"
     CONFIG_SCHEMA: "Final[RelPath]" = cast("RelPath", "config.json")
     _PassGen: "ClassVar[Optional[WfExSPassphraseGenerator]]" = None
@@ -554,26 +560,20 @@ class WfExSBackend:
         else:
             cacheDir = tempfile.mkdtemp(prefix="WfExS", suffix="backend")
             # Assuring this temporal directory is removed at the end
-            atexit.register(shutil.rmtree, cacheDir)
+            register_tempdir_cleanup(cacheDir)
 
         # Setting up caching directories
         self.cacheDir = cacheDir
         self.cachePathMap: "MutableMapping[str, AbsPath]" = dict()
-        cacheWorkflowDir = cast("AbsPath", os.path.join(cacheDir, "wf-cache"))
-        os.makedirs(cacheWorkflowDir, exist_ok=True)
-        self.cachePathMap[CacheType.Workflow] = cacheWorkflowDir
-
-        cacheROCrateDir = cast("AbsPath", os.path.join(cacheDir, "ro-crate-cache"))
-        os.makedirs(cacheROCrateDir, exist_ok=True)
-        self.cachePathMap[CacheType.ROCrate] = cacheROCrateDir
-
-        cacheTRSFilesDir = cast("AbsPath", os.path.join(cacheDir, "trs-files-cache"))
-        os.makedirs(cacheTRSFilesDir, exist_ok=True)
-        self.cachePathMap[CacheType.TRS] = cacheTRSFilesDir
-
-        cacheWorkflowInputsDir = cast("AbsPath", os.path.join(cacheDir, "wf-inputs"))
-        os.makedirs(cacheWorkflowInputsDir, exist_ok=True)
-        self.cachePathMap[CacheType.Input] = cacheWorkflowInputsDir
+        for cache_type, cache_relpath in (
+            (CacheType.Workflow, "wf-cache"),
+            (CacheType.ROCrate, "ro-crate-cache"),
+            (CacheType.TRS, "trs-files-cache"),
+            (CacheType.Input, "wf-inputs"),
+        ):
+            cache_type_dir = cast("AbsPath", os.path.join(cacheDir, cache_relpath))
+            os.makedirs(cache_type_dir, exist_ok=True)
+            self.cachePathMap[cache_type] = cache_type_dir
 
         # This directory will be used to store the intermediate
         # and final results before they are sent away
@@ -587,7 +587,7 @@ class WfExSBackend:
         else:
             baseWorkDir = tempfile.mkdtemp(prefix="WfExS-workdir", suffix="backend")
             # Assuring this temporal directory is removed at the end
-            atexit.register(shutil.rmtree, baseWorkDir)
+            register_tempdir_cleanup(baseWorkDir)
 
         self.baseWorkDir = baseWorkDir
         self.defaultParanoidMode = False
@@ -1557,15 +1557,8 @@ class WfExSBackend:
         :param scheme:
         :param handler:
         """
-        if not isinstance(
-            handler,
-            (
-                types.FunctionType,
-                types.LambdaType,
-                types.MethodType,
-                types.BuiltinFunctionType,
-                types.BuiltinMethodType,
-            ),
+        if not isinstance(handler, DocumentedProtocolFetcher) or not callable(
+            handler.fetcher
         ):
             raise WfExSBackendException(
                 "Trying to set for scheme {} a invalid handler".format(scheme)
@@ -1741,6 +1734,33 @@ class WfExSBackend:
     TRS_METADATA_FILE: "Final[RelPath]" = cast("RelPath", "trs_metadata.json")
     TRS_QUERY_CACHE_FILE: "Final[RelPath]" = cast("RelPath", "trs_result.json")
 
+    # Parsed TRS answers, shared by all the instances within the process.
+    # The key includes the modification time of the cached answer, so
+    # refreshed answers are parsed again
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _parseTRSCachedJSON(real_cached_json: "str", mtime_ns: "int") -> "Any":
+        with open(real_cached_json, mode="rb") as cjH:
+            return json_loads(cjH.read())
+
+    @classmethod
+    def _readTRSCachedJSON(cls, cached_json: "str") -> "Any":
+        """
+        It returns the parsed content of a cached TRS answer
+        """
+        real_cached_json = os.path.realpath(cached_json)
+        return cls._parseTRSCachedJSON(
+            real_cached_json, os.stat(real_cached_json).st_mtime_ns
+        )
+
+    @staticmethod
+    def _rawTRSCachedJSON(cached_json: "str") -> "str":
+        """
+        The raw content of a cached TRS answer is only needed for reports
+        """
+        with open(cached_json, mode="rb") as cjH:
+            return cjH.read().decode("utf-8", errors="replace")
+
     def getWorkflowRepoFromTRS(
         self,
         trs_endpoint: "str",
@@ -1762,7 +1782,7 @@ class WfExSBackend:
                 "AbsPath", tempfile.mkdtemp(prefix="WfExS", suffix="TRSFetched")
             )
             # Assuring this temporal directory is removed at the end
-            atexit.register(shutil.rmtree, meta_dir)
+            register_tempdir_cleanup(meta_dir)
         else:
             # Assuring the destination directory does exist
             os.makedirs(meta_dir, exist_ok=True)
@@ -1808,8 +1828,7 @@ class WfExSBackend:
         if not os.path.exists(trsMetadataCache):
             os.symlink(os.path.basename(trs_cached_content.path), trsMetadataCache)
 
-        with open(trsMetadataCache, mode="r", encoding="utf-8") as ctmf:
-            trs_endpoint_meta = json.load(ctmf)
+        trs_endpoint_meta = self._readTRSCachedJSON(trsMetadataCache)
 
         # Minimal check
         trs_version = trs_endpoint_meta.get("api_version")
@@ -1838,18 +1857,16 @@ class WfExSBackend:
         if not os.path.exists(trsQueryCache):
             os.symlink(os.path.basename(trs_cached_tool.path), trsQueryCache)
 
-        with open(trsQueryCache, mode="r", encoding="utf-8") as tQ:
-            rawToolDesc = tQ.read()
-
         # If the tool does not exist, an exception will be thrown before
-        jd = json.JSONDecoder()
-        toolDesc = jd.decode(rawToolDesc)
+        toolDesc = self._readTRSCachedJSON(trsQueryCache)
 
         # If the tool is not a workflow, complain
         if toolDesc.get("toolclass", {}).get("name", "") != "Workflow":
             raise WFException(
                 "Tool {} from {} is not labelled as a workflow. Raw answer:\n{}".format(
-                    workflow_id_str, trs_endpoint, rawToolDesc
+                    workflow_id_str,
+                    trs_endpoint,
+                    self._rawTRSCachedJSON(trsQueryCache),
                 )
             )
 
@@ -1857,7 +1874,10 @@ class WfExSBackend:
         if len(possibleToolVersions) == 0:
             raise WFException(
                 "Version {} not found in workflow {} from {} . Raw answer:\n{}".format(
-                    version_id, workflow_id_str, trs_endpoint, rawToolDesc
+                    version_id,
+                    workflow_id_str,
+                    trs_endpoint,
+                    self._rawTRSCachedJSON(trsQueryCache),
                 )
             )
 
@@ -1874,7 +1894,10 @@ class WfExSBackend:
             else:
                 raise WFException(
                     "Version {} not found in workflow {} from {} . Raw answer:\n{}".format(
-                        version_id, workflow_id_str, trs_endpoint, rawToolDesc
+                        version_id,
+                        workflow_id_str,
+                        trs_endpoint,
+                        self._rawTRSCachedJSON(trsQueryCache),
                     )
                 )
         else:
@@ -1891,7 +1914,9 @@ class WfExSBackend:
         if toolVersion is None:
             raise WFException(
                 "No valid version was found in workflow {} from {} . Raw answer:\n{}".format(
-                    workflow_id_str, trs_endpoint, rawToolDesc
+                    workflow_id_str,
+                    trs_endpoint,
+                    self._rawTRSCachedJSON(trsQueryCache),
                 )
             )
 
@@ -1900,21 +1925,33 @@ class WfExSBackend:
         if not isinstance(toolDescriptorTypes, list):
             raise WFException(
                 'Version {} of workflow {} from {} has no valid "descriptor_type" (should be a list). Raw answer:\n{}'.format(
-                    version_id, workflow_id_str, trs_endpoint, rawToolDesc
+                    version_id,
+                    workflow_id_str,
+                    trs_endpoint,
+                    self._rawTRSCachedJSON(trsQueryCache),
                 )
             )
 
         # Now, realize whether it matches
         chosenDescriptorType = descriptor_type
         if chosenDescriptorType is None:
-            for candidateDescriptorType in WF.RECOGNIZED_TRS_DESCRIPTORS.keys():
-                if candidateDescriptorType in toolDescriptorTypes:
-                    chosenDescriptorType = candidateDescriptorType
-                    break
-            else:
+            # Preference order is the one from the recognized descriptors
+            toolDescriptorTypesSet = set(toolDescriptorTypes)
+            chosenDescriptorType = next(
+                (
+                    candidateDescriptorType
+                    for candidateDescriptorType in WF.RECOGNIZED_TRS_DESCRIPTORS
+                    if candidateDescriptorType in toolDescriptorTypesSet
+                ),
+                None,
+            )
+            if chosenDescriptorType is None:
                 raise WFException(
                     'Version {} of workflow {} from {} has no acknowledged "descriptor_type". Raw answer:\n{}'.format(
-                        version_id, workflow_id_str, trs_endpoint, rawToolDesc
+                        version_id,
+                        workflow_id_str,
+                        trs_endpoint,
+                        self._rawTRSCachedJSON(trsQueryCache),
                     )
                 )
         elif chosenDescriptorType not in toolVersion["descriptor_type"]:
@@ -1924,7 +1961,7 @@ class WfExSBackend:
                     version_id,
                     workflow_id_str,
                     trs_endpoint,
-                    rawToolDesc,
+                    self._rawTRSCachedJSON(trsQueryCache),
                 )
             )
         elif chosenDescriptorType not in WF.RECOGNIZED_TRS_DESCRIPTORS:
@@ -1934,18 +1971,13 @@ class WfExSBackend:
                     version_id,
                     workflow_id_str,
                     trs_endpoint,
-                    rawToolDesc,
+                    self._rawTRSCachedJSON(trsQueryCache),
                 )
             )
 
-        toolFilesURL = (
-            trs_tools_url
-            + "/versions/"
-            + urllib.parse.quote(toolVersionId, safe="")
-            + "/"
-            + urllib.parse.quote(chosenDescriptorType, safe="")
-            + "/files"
-        )
+        quotedToolVersionId = urllib.parse.quote(toolVersionId, safe="")
+        quotedDescriptorType = urllib.parse.quote(chosenDescriptorType, safe="")
+        toolFilesURL = f"{trs_tools_url}/versions/{quotedToolVersionId}/{quotedDescriptorType}/files"
 
         # Detecting whether RO-Crate trick will work
         if trs_endpoint_meta.get("organization", {}).get("name") == "WorkflowHub":
@@ -1953,7 +1985,7 @@ class WfExSBackend:
             # And this is the moment where the RO-Crate must be fetched
             roCrateURL = cast(
                 "URIType",
-                toolFilesURL + "?" + urllib.parse.urlencode({"format": "zip"}),
+                toolFilesURL + "?format=zip",
             )
 
             (
@@ -2173,7 +2205,7 @@ class WfExSBackend:
                 "putative workflow {} seems to be a packed RO-Crate".format(remote_url)
             )
 
-            crate_hashed_id = hashlib.sha1(remote_url.encode("utf-8")).hexdigest()
+            crate_hashed_id = hashed_id_from_string(remote_url)
             roCrateFile = os.path.join(
                 self.cacheROCrateDir, crate_hashed_id + self.DEFAULT_RO_EXTENSION
             )
@@ -2199,6 +2231,68 @@ class WfExSBackend:
                 cached_content.metadata_array,
             )
 
+    ROCRATE_METADATA_FILENAME: "Final[str]" = "ro-crate-metadata.json"
+
+    def _getROCrateWorkflowHints(
+        self, roCrateFile: "AbsPath"
+    ) -> "Optional[Tuple[Optional[str], Optional[str], Optional[URIType], Optional[URIType]]]":
+        """
+        It learns the programming language id and url, as well as the
+        workflow url and the repository it is based on, just reading the
+        RO-Crate metadata file. So, the whole RO-Crate does not have to be
+        unpacked and instantiated. When the metadata file does not have
+        the expected shape, it returns None.
+        """
+        try:
+            if os.path.isdir(roCrateFile):
+                with open(
+                    os.path.join(roCrateFile, self.ROCRATE_METADATA_FILENAME),
+                    mode="rb",
+                ) as mH:
+                    manifest = json_loads(mH.read())
+            else:
+                with zipfile.ZipFile(roCrateFile) as zf:
+                    manifest = json_loads(zf.read(self.ROCRATE_METADATA_FILENAME))
+
+            graph = manifest["@graph"]
+            entitiesById = {
+                e["@id"]: e for e in graph if isinstance(e, dict) and "@id" in e
+            }
+            mainEntityIdHolder = next(
+                e["about"]["@id"]
+                for e in entitiesById.values()
+                if e.get("@type") == "CreativeWork" and ".json" in e["@id"]
+            )
+            rootEntity = entitiesById[mainEntityIdHolder]
+            mainEntity = entitiesById[rootEntity["mainEntity"]["@id"]]
+            languageEntity = entitiesById[mainEntity["programmingLanguage"]["@id"]]
+
+            languageId = languageEntity.get("identifier")
+            if isinstance(languageId, dict):
+                languageId = languageId.get("@id")
+            languageUrl = languageEntity.get("url")
+            if isinstance(languageUrl, dict):
+                languageUrl = languageUrl.get("@id")
+
+            return (
+                languageId,
+                languageUrl,
+                mainEntity.get("url"),
+                rootEntity.get("isBasedOn"),
+            )
+        except (
+            OSError,
+            ValueError,
+            KeyError,
+            TypeError,
+            StopIteration,
+            zipfile.BadZipFile,
+        ) as e:
+            self.logger.debug(
+                f"Unable to get workflow hints directly from {roCrateFile} metadata file ({e}). Parsing the whole RO-Crate"
+            )
+            return None
+
     def getWorkflowRepoFromROCrateFile(
         self,
         roCrateFile: "AbsPath",
@@ -2210,39 +2304,51 @@ class WfExSBackend:
         :param expectedEngineDesc: If defined, an instance of WorkflowType
         :return:
         """
-        roCrateObj = FixedROCrate(roCrateFile)
-
-        # TODO: get roCrateObj mainEntity programming language
-        # self.logger.debug(roCrateObj.root_dataset.as_jsonld())
-        mainEntityProgrammingLanguageId = None
-        mainEntityProgrammingLanguageUrl = None
-        mainEntityIdHolder: "Optional[str]" = None
-        mainEntityId = None
-        workflowPID = None
-        workflowUploadURL = None
-        workflowRepoURL = None
-        workflowTypeId = None
-        for e in roCrateObj.get_entities():
-            if (
-                (mainEntityIdHolder is None)
-                and e["@type"] == "CreativeWork"
-                and ".json" in e["@id"]
-            ):
-                mainEntityIdHolder = e.as_jsonld()["about"]["@id"]
-            elif e["@id"] == mainEntityIdHolder:
-                eAsLD = e.as_jsonld()
-                mainEntityId = eAsLD["mainEntity"]["@id"]
-                workflowRepoURL = eAsLD.get("isBasedOn")
-                workflowPID = eAsLD.get("identifier")
-            elif e["@id"] == mainEntityId:
-                eAsLD = e.as_jsonld()
-                workflowUploadURL = eAsLD.get("url")
-                workflowTypeId = eAsLD["programmingLanguage"]["@id"]
-            elif e["@id"] == workflowTypeId:
-                # A bit dirty, but it works
-                eAsLD = e.as_jsonld()
-                mainEntityProgrammingLanguageId = eAsLD.get("identifier", {}).get("@id")
-                mainEntityProgrammingLanguageUrl = eAsLD.get("url", {}).get("@id")
+        roCrateHints = self._getROCrateWorkflowHints(roCrateFile)
+        if roCrateHints is not None:
+            (
+                mainEntityProgrammingLanguageId,
+                mainEntityProgrammingLanguageUrl,
+                workflowUploadURL,
+                workflowRepoURL,
+            ) = roCrateHints
+        else:
+            # Fallback to the whole RO-Crate parsing
+            roCrateObj = FixedROCrate(roCrateFile)
+
+            # TODO: get roCrateObj mainEntity programming language
+            # self.logger.debug(roCrateObj.root_dataset.as_jsonld())
+            mainEntityProgrammingLanguageId = None
+            mainEntityProgrammingLanguageUrl = None
+            mainEntityIdHolder: "Optional[str]" = None
+            mainEntityId = None
+            workflowPID = None
+            workflowUploadURL = None
+            workflowRepoURL = None
+            workflowTypeId = None
+            for e in roCrateObj.get_entities():
+                if (
+                    (mainEntityIdHolder is None)
+                    and e["@type"] == "CreativeWork"
+                    and ".json" in e["@id"]
+                ):
+                    mainEntityIdHolder = e.as_jsonld()["about"]["@id"]
+                elif e["@id"] == mainEntityIdHolder:
+                    eAsLD = e.as_jsonld()
+                    mainEntityId = eAsLD["mainEntity"]["@id"]
+                    workflowRepoURL = eAsLD.get("isBasedOn")
+                    workflowPID = eAsLD.get("identifier")
+                elif e["@id"] == mainEntityId:
+                    eAsLD = e.as_jsonld()
+                    workflowUploadURL = eAsLD.get("url")
+                    workflowTypeId = eAsLD["programmingLanguage"]["@id"]
+                elif e["@id"] == workflowTypeId:
+                    # A bit dirty, but it works
+                    eAsLD = e.as_jsonld()
+                    mainEntityProgrammingLanguageId = eAsLD.get("identifier", {}).get(
+                        "@id"
+                    )
+                    mainEntityProgrammingLanguageUrl = eAsLD.get("url", {}).get("@id")
 
         # Now, it is time to match the language id
         engineDescById: "Optional[WorkflowType]" = None
@@ -2357,7 +2463,7 @@ class WfExSBackend:
                 "Cannot download RO-Crate from {}, {}".format(roCrateURL, e)
             ) from e
 
-        crate_hashed_id = hashlib.sha1(roCrateURL.encode("utf-8")).hexdigest()
+        crate_hashed_id = hashed_id_from_string(roCrateURL)
         cachedFilename = os.path.join(
             self.cacheROCrateDir, crate_hashed_id + self.DEFAULT_RO_EXTENSION
         )
@@ -2408,8 +2514,7 @@ class WfExSBackend:
             remote_uri = remote_uri_e.uri
 
             parsedURI = parse.urlparse(remote_uri)
-            validableComponents = [parsedURI.scheme, parsedURI.path]
-            if not all(validableComponents):
+            if not (parsedURI.scheme and parsedURI.path):
                 raise RuntimeError(
                     f"Input does not have {remote_uri} as a valid remote URL or CURIE source "
                 )
@@ -2423,12 +2528,14 @@ class WfExSBackend:
         assert firstParsedURI is not None
 
         # Assure workflow inputs directory exists before the next step
+        workflowInputs_destdir: "AbsPath"
         if isinstance(dest, CacheType):
             workflowInputs_destdir = self.cachePathMap[dest]
+        else:
+            workflowInputs_destdir = dest
 
-        self.logger.info(
-            "downloading workflow input: {}".format(" or ".join(remote_uris))
-        )
+        # Messages are lazily formatted, as these are emitted for every input
+        self.logger.info("downloading workflow input: %s", " or ".join(remote_uris))
 
         cached_content = self.cacheHandler.fetch(
             remote_file,
@@ -2441,19 +2548,17 @@ class WfExSBackend:
         # TODO: Properly test alternatives
         downloaded_uri = firstURI.uri
         self.logger.info(
-            "downloaded workflow input: {} => {}".format(
-                downloaded_uri, cached_content.path
-            )
+            "downloaded workflow input: %s => %s", downloaded_uri, cached_content.path
         )
 
         prettyFilename = None
         if len(cached_content.metadata_array) > 0:
-            self.logger.info(
-                "downloaded workflow input chain: {} => {}".format(
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info(
+                    "downloaded workflow input chain: %s => %s",
                     " -> ".join(map(lambda m: m.uri, cached_content.metadata_array)),
                     cached_content.path,
                 )
-            )
 
             firstLicensedURI = LicensedURI(
                 uri=cached_content.metadata_array[0].uri,
@@ -2490,3 +2595,83 @@ class WfExSBackend:
             metadata_array=cached_content.metadata_array,
             fingerprint=cached_content.fingerprint,
         )
+
+    def downloadContents(
+        self,
+        remote_files: "Sequence[Union[LicensedURI, Sequence[LicensedURI]]]",
+        dest: "Union[AbsPath, CacheType]",
+        vault: "Optional[SecurityContextVault]" = None,
+        offline: "bool" = False,
+        ignoreCache: "bool" = False,
+        registerInCache: "bool" = True,
+        keep_cache_licence: "bool" = True,
+    ) -> "Sequence[MaterializedContent]":
+        """
+        Batch version of downloadContent. The contents are grouped by
+        the scheme and host of their first URI. Each group is fetched
+        sequentially, so the connections to that host are reused, while
+        the different groups are fetched concurrently.
+
+        :param remote_files: The contents to download, as accepted by downloadContent
+        :return: The materialized contents, in the very same order
+        """
+
+        # Alternate URIs can come in any kind of sequence, but
+        # downloadContent only recognizes them in lists
+        norm_remote_files: "Sequence[Union[LicensedURI, Sequence[LicensedURI]]]" = [
+            remote_file if isinstance(remote_file, LicensedURI) else list(remote_file)
+            for remote_file in remote_files
+        ]
+
+        def fetch_group(
+            group: "Sequence[int]",
+        ) -> "Sequence[Tuple[int, MaterializedContent]]":
+            return [
+                (
+                    i_remote,
+                    self.downloadContent(
+                        norm_remote_files[i_remote],
+                        dest=dest,
+                        vault=vault,
+                        offline=offline,
+                        ignoreCache=ignoreCache,
+                        registerInCache=registerInCache,
+                        keep_cache_licence=keep_cache_licence,
+                    ),
+                )
+                for i_remote in group
+            ]
+
+        host_groups: "MutableMapping[Tuple[str, str], MutableSequence[int]]" = dict()
+        for i_remote, remote_file in enumerate(norm_remote_files):
+            first_remote = (
+                remote_file if isinstance(remote_file, LicensedURI) else remote_file[0]
+            )
+            parsed_first = parse.urlparse(first_remote.uri)
+            host_groups.setdefault(
+                (parsed_first.scheme, parsed_first.netloc), []
+            ).append(i_remote)
+
+        mat_contents: "MutableSequence[Optional[MaterializedContent]]" = [None] * len(
+            remote_files
+        )
+        if len(host_groups) <= 1:
+            # Singleton inputs or hosts do not need the threads
+            for group in host_groups.values():
+                for i_remote, mat_content in fetch_group(group):
+                    mat_contents[i_remote] = mat_content
+        else:
+            with concurrent.futures.ThreadPoolExecutor(
+                max_workers=min(self.MAX_PARALLEL_DOWNLOAD_HOSTS, len(host_groups)),
+                thread_name_prefix="wfexs-downloads",
+            ) as executor:
+                for group_future in concurrent.futures.as_completed(
+                    [
+                        executor.submit(fetch_group, group)
+                        for group in host_groups.values()
+                    ]
+                ):
+                    for i_remote, mat_content in group_future.result():
+                        mat_contents[i_remote] = mat_content
+
+        return cast("Sequence[MaterializedContent]", mat_contents)
@@ -18,8 +18,10 @@
 from __future__ import absolute_import
 
 import atexit
+import concurrent.futures
 import copy
 import datetime
+import fnmatch
 import inspect
 import json
 import logging
@@ -28,11 +30,13 @@ import pathlib
 import platform
 import re
 import shutil
+import stat
 import subprocess
 import sys
 import tempfile
 import threading
 import time
+import types
 import warnings
 
 from typing import (
@@ -350,12 +354,20 @@ class WF:
     )
     TRS_TOOLS_PATH: "Final[str]" = "tools/"
 
-    WORKFLOW_ENGINES: "Final[Sequence[WorkflowType]]" = list(
-        map(lambda clazz: clazz.MyWorkflowType(), WORKFLOW_ENGINE_CLASSES)
+    # Cacheable inputs are downloaded concurrently, before they are
+    # materialized one by one in the working directory
+    MAX_PARALLEL_INPUT_DOWNLOADS: "Final[int]" = 8
+    _prefetched_inputs: "Optional[Mapping[str, concurrent.futures.Future[MaterializedContent]]]" = (
+        None
     )
 
-    RECOGNIZED_TRS_DESCRIPTORS: "Final[Mapping[TRS_Workflow_Descriptor, WorkflowType]]" = dict(
-        map(lambda t: (t.trs_descriptor, t), WORKFLOW_ENGINES)
+    WORKFLOW_ENGINES: "Final[Sequence[WorkflowType]]" = tuple(
+        clazz.MyWorkflowType() for clazz in WORKFLOW_ENGINE_CLASSES
+    )
+
+    # Read-only, so it can be shared among threads without copies
+    RECOGNIZED_TRS_DESCRIPTORS: "Final[Mapping[TRS_Workflow_Descriptor, WorkflowType]]" = types.MappingProxyType(
+        {t.trs_descriptor: t for t in WORKFLOW_ENGINES}
     )
 
     def __init__(
@@ -1421,7 +1433,7 @@ class WF:
         # A valid engine must be identified from the fetched content
         # TODO: decide whether to force some specific version
         if self.engineDesc is None:
-            for engineDesc in self.WORKFLOW_ENGINES:
+            for engineDesc in self._engineProbingOrder(localWorkflow):
                 self.logger.debug("Testing engine " + engineDesc.trs_descriptor)
                 engine = self.wfexs.instantiateEngine(engineDesc, self.stagedSetup)
 
@@ -1461,6 +1473,41 @@ class WF:
         self.engineVer = engineVer
         self.localWorkflow = candidateLocalWorkflow
 
+    def _engineProbingOrder(
+        self, localWorkflow: "LocalWorkflow"
+    ) -> "Sequence[WorkflowType]":
+        """
+        Engines whose hint file patterns match the names found at the
+        workflow location are probed first, as identifying a workflow
+        can be expensive. The remaining ones keep their relative order,
+        so all of them are eventually probed
+        """
+        if localWorkflow.relPath is not None:
+            probePath = os.path.join(localWorkflow.dir, localWorkflow.relPath)
+        else:
+            probePath = localWorkflow.dir
+
+        names: "Sequence[str]"
+        if os.path.isdir(probePath):
+            try:
+                names = os.listdir(probePath)
+            except OSError:
+                names = []
+        else:
+            names = [os.path.basename(probePath)]
+
+        def _hintHits(engineDesc: "WorkflowType") -> "int":
+            return sum(
+                1
+                for pattern in getattr(engineDesc.clazz, "HINT_FILE_PATTERNS", [])
+                if len(fnmatch.filter(names, pattern)) > 0
+            )
+
+        # sorted is stable, so the declared order breaks the ties
+        return sorted(
+            self.WORKFLOW_ENGINES, key=lambda engineDesc: -_hintHits(engineDesc)
+        )
+
     def setupEngine(self, offline: "bool" = False, ignoreCache: "bool" = False) -> None:
         # The engine is populated by self.fetchWorkflow()
         if self.engine is None:
@@ -1621,14 +1668,47 @@ class WF:
             self.extrapolatedInputsDir is not None
         ), "The working directory should not be corrupted beyond basic usage"
 
-        theParams, numInputs, the_failed_uris = self.fetchInputs(
-            formatted_params,
-            workflowInputs_destdir=self.inputsDir,
-            workflowExtrapolatedInputs_destdir=self.extrapolatedInputsDir,
-            offline=offline,
-            ignoreCache=ignoreCache,
-            lastInput=lastInput,
+        # Downloads are independent, so they are overlapped
+        prefetch_jobs: "MutableMapping[str, Tuple[Sch_InputURI_Fetchable, Optional[str]]]" = (
+            dict()
         )
+        if not offline:
+            self._collectPrefetchableInputs(formatted_params, prefetch_jobs)
+
+        if len(prefetch_jobs) > 1:
+            with concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.MAX_PARALLEL_INPUT_DOWNLOADS,
+                thread_name_prefix="wfexs-inputs",
+            ) as executor:
+                self._prefetched_inputs = {
+                    job_key: executor.submit(
+                        self._downloadCacheableInput,
+                        remote_file,
+                        contextName,
+                        ignoreCache,
+                    )
+                    for job_key, (remote_file, contextName) in prefetch_jobs.items()
+                }
+                try:
+                    theParams, numInputs, the_failed_uris = self.fetchInputs(
+                        formatted_params,
+                        workflowInputs_destdir=self.inputsDir,
+                        workflowExtrapolatedInputs_destdir=self.extrapolatedInputsDir,
+                        offline=offline,
+                        ignoreCache=ignoreCache,
+                        lastInput=lastInput,
+                    )
+                finally:
+                    self._prefetched_inputs = None
+        else:
+            theParams, numInputs, the_failed_uris = self.fetchInputs(
+                formatted_params,
+                workflowInputs_destdir=self.inputsDir,
+                workflowExtrapolatedInputs_destdir=self.extrapolatedInputsDir,
+                offline=offline,
+                ignoreCache=ignoreCache,
+                lastInput=lastInput,
+            )
 
         if len(the_failed_uris) > 0:
             self.logger.error(
@@ -1701,6 +1781,80 @@ class WF:
             was_simple,
         )
 
+    @staticmethod
+    def _prefetchKey(
+        remote_file: "Sch_InputURI_Fetchable", contextName: "Optional[str]"
+    ) -> "str":
+        return json.dumps([remote_file, contextName], sort_keys=True, default=str)
+
+    def _collectPrefetchableInputs(
+        self,
+        params: "Union[ParamsBlock, Sequence[ParamsBlock]]",
+        prefetch_jobs: "MutableMapping[str, Tuple[Sch_InputURI_Fetchable, Optional[str]]]",
+    ) -> None:
+        """
+        It gathers the cacheable remote inputs which are going to be
+        fetched by fetchInputs, following the very same rules
+        """
+        paramsIter = params.items() if isinstance(params, dict) else enumerate(params)
+        for _, inputs in paramsIter:
+            if not isinstance(inputs, dict):
+                continue
+
+            inputClass = inputs.get("c-l-a-s-s")
+            if inputClass is None:
+                # possible nested files
+                self._collectPrefetchableInputs(inputs, prefetch_jobs)
+            elif (
+                inputClass
+                in (
+                    ContentKind.File.name,
+                    ContentKind.Directory.name,
+                    ContentKind.ContentWithURIs.name,
+                )
+                and not inputs.get("autoFill", False)
+                and not self.paranoidMode
+                and inputs.get("cache", True)
+                and inputs.get("url") is not None
+            ):
+                contextName = inputs.get("security-context")
+                # The tables from contents with URIs are prefetched, but
+                # the URIs within them are only known after parsing them
+                remote_files_groups = (
+                    (inputs.get("url"),)
+                    if inputClass == ContentKind.ContentWithURIs.name
+                    else (inputs.get("url"), inputs.get("secondary-urls"))
+                )
+                for remote_files in remote_files_groups:
+                    if remote_files is None:
+                        continue
+                    if not isinstance(remote_files, list):
+                        remote_files = [remote_files]
+                    for remote_file in remote_files:
+                        prefetch_jobs.setdefault(
+                            self._prefetchKey(remote_file, contextName),
+                            (remote_file, contextName),
+                        )
+
+    def _downloadCacheableInput(
+        self,
+        remote_file: "Sch_InputURI_Fetchable",
+        contextName: "Optional[str]",
+        ignoreCache: "bool",
+    ) -> "MaterializedContent":
+        alt_remote_file, alt_is_plain = self._buildLicensedURI(
+            remote_file, contextName=contextName
+        )
+        return self.wfexs.downloadContent(
+            alt_remote_file,
+            dest=CacheType.Input,
+            offline=False,
+            vault=self.vault,
+            ignoreCache=ignoreCache,
+            registerInCache=True,
+            keep_cache_licence=alt_is_plain,
+        )
+
     def _fetchRemoteFile(
         self,
         remote_file: "Sch_InputURI_Fetchable",
@@ -1715,21 +1869,37 @@ class WF:
         prettyRelname: "Optional[RelPath]" = None,
         ignoreCache: "bool" = False,
     ) -> "Sequence[MaterializedContent]":
-        # Embedding the context
-        alt_remote_file, alt_is_plain = self._buildLicensedURI(
-            remote_file, contextName=contextName
-        )
-        # Trying to preserve what it is returned by the cache
-        # unless we are explicitly feeding a licence
-        matContent = self.wfexs.downloadContent(
-            alt_remote_file,
-            dest=storeDir,
-            offline=offline,
-            vault=self.vault,
-            ignoreCache=ignoreCache or not cacheable,
-            registerInCache=cacheable,
-            keep_cache_licence=alt_is_plain,
-        )
+        # Was it already downloaded in the background?
+        matContent: "Optional[MaterializedContent]" = None
+        if cacheable and self._prefetched_inputs is not None:
+            prefetched = self._prefetched_inputs.get(
+                self._prefetchKey(remote_file, contextName)
+            )
+            if prefetched is not None:
+                try:
+                    matContent = prefetched.result()
+                except Exception as e:
+                    # It is retried below, so the failure is properly reported
+                    self.logger.debug(
+                        f"Concurrent download of {remote_file} failed ({e}). Retrying"
+                    )
+
+        if matContent is None:
+            # Embedding the context
+            alt_remote_file, alt_is_plain = self._buildLicensedURI(
+                remote_file, contextName=contextName
+            )
+            # Trying to preserve what it is returned by the cache
+            # unless we are explicitly feeding a licence
+            matContent = self.wfexs.downloadContent(
+                alt_remote_file,
+                dest=storeDir,
+                offline=offline,
+                vault=self.vault,
+                ignoreCache=ignoreCache or not cacheable,
+                registerInCache=cacheable,
+                keep_cache_licence=alt_is_plain,
+            )
 
         # Now, time to create the link
         if prettyRelname is None:
@@ -1745,14 +1915,22 @@ class WF:
             prettyRelname = cast("RelPath", os.path.basename(realPrettyLocal))
             prettyLocal = cast("AbsPath", os.path.join(inputDestDir, prettyRelname))
 
-        # Checking whether local name hardening is needed
+        # Checking whether local name hardening is needed.
+        # A single lstat call tells whether the name is free,
+        # which is the most common case
+        prettyLocalFree = False
         if not hardenPrettyLocal:
-            if os.path.islink(prettyLocal):
-                oldLocal = os.readlink(prettyLocal)
+            try:
+                prettyLocalStat = os.lstat(prettyLocal)
+            except OSError:
+                prettyLocalFree = True
+            else:
+                if stat.S_ISLNK(prettyLocalStat.st_mode):
+                    oldLocal = os.readlink(prettyLocal)
 
-                hardenPrettyLocal = oldLocal != matContent.local
-            elif os.path.exists(prettyLocal):
-                hardenPrettyLocal = True
+                    hardenPrettyLocal = oldLocal != matContent.local
+                else:
+                    hardenPrettyLocal = True
 
         if hardenPrettyLocal:
             # Trying to avoid collisions on input naming
@@ -1760,7 +1938,7 @@ class WF:
                 "AbsPath", os.path.join(inputDestDir, prefix + prettyRelname)
             )
 
-        if not os.path.exists(prettyLocal):
+        if prettyLocalFree or not os.path.exists(prettyLocal):
             # We are either hardlinking or copying here
             link_or_copy(matContent.local, prettyLocal)
 
@@ -2366,323 +2544,343 @@ class WF:
 
         the_failed_uris: "MutableSequence[str]" = []
 
-        paramsIter = params.items() if isinstance(params, dict) else enumerate(params)
-        for key, inputs in paramsIter:
-            # We are here for the
-            linearKey = prefix + key
-            if isinstance(inputs, dict):
-                inputClass = inputs.get("c-l-a-s-s")
-                if inputClass is not None:
-                    if inputClass in (
-                        ContentKind.File.name,
-                        ContentKind.Directory.name,
-                    ):  # input files
-                        inputDestDir = workflowInputs_destdir
-                        globExplode = None
-
-                        path_tokens = linearKey.split(".")
-                        # Filling in the defaults
-                        assert len(path_tokens) >= 1
-                        pretty_relname = path_tokens[-1]
-                        if len(path_tokens) > 1:
-                            relative_dir = os.path.join(*path_tokens[0:-1])
-                        else:
-                            relative_dir = None
+        # Explicit depth-first traversal, which keeps the same visiting
+        # order (and input numbering) a recursive one would have
+        paramsIterStack: "MutableSequence[Tuple[str, Iterator[Tuple[Any, Any]]]]" = [
+            (
+                prefix,
+                iter(params.items() if isinstance(params, dict) else enumerate(params)),
+            )
+        ]
+        while len(paramsIterStack) > 0:
+            keyPrefix, paramsIter = paramsIterStack[-1]
+            for key, inputs in paramsIter:
+                # We are here for the
+                linearKey = keyPrefix + key
+                if isinstance(inputs, dict):
+                    inputClass = inputs.get("c-l-a-s-s")
+                    if inputClass is not None:
+                        if inputClass in (
+                            ContentKind.File.name,
+                            ContentKind.Directory.name,
+                        ):  # input files
+                            inputDestDir = workflowInputs_destdir
+                            globExplode = None
+
+                            path_tokens = linearKey.split(".")
+                            # Filling in the defaults
+                            assert len(path_tokens) >= 1
+                            pretty_relname = path_tokens[-1]
+                            if len(path_tokens) > 1:
+                                relative_dir = os.path.join(*path_tokens[0:-1])
+                            else:
+                                relative_dir = None
 
-                        if inputClass == ContentKind.Directory.name:
-                            # We have to autofill this with the outputs directory,
-                            # so results are properly stored (without escaping the jail)
-                            if inputs.get("autoFill", False):
-                                if inputs.get("autoPrefix", True):
-                                    autoFilledDir = os.path.join(
-                                        self.outputsDir, *path_tokens
+                            if inputClass == ContentKind.Directory.name:
+                                # We have to autofill this with the outputs directory,
+                                # so results are properly stored (without escaping the jail)
+                                if inputs.get("autoFill", False):
+                                    if inputs.get("autoPrefix", True):
+                                        autoFilledDir = os.path.join(
+                                            self.outputsDir, *path_tokens
+                                        )
+                                    else:
+                                        autoFilledDir = self.outputsDir
+
+                                    theInputs.append(
+                                        MaterializedInput(
+                                            name=linearKey,
+                                            values=[autoFilledDir],
+                                            autoFilled=True,
+                                        )
                                     )
-                                else:
-                                    autoFilledDir = self.outputsDir
+                                    continue
+
+                                globExplode = inputs.get("globExplode")
+                            elif inputClass == ContentKind.File.name and inputs.get(
+                                "autoFill", False
+                            ):
+                                # We have to autofill this with the outputs directory,
+                                # so results are properly stored (without escaping the jail)
+                                autoFilledFile = os.path.join(
+                                    self.outputsDir, path_tokens
+                                )
+                                autoFilledDir = os.path.dirname(autoFilledFile)
+                                # This is needed to assure the path exists
+                                if autoFilledDir != self.outputsDir:
+                                    os.makedirs(autoFilledDir, exist_ok=True)
 
                                 theInputs.append(
                                     MaterializedInput(
                                         name=linearKey,
-                                        values=[autoFilledDir],
+                                        values=[autoFilledFile],
                                         autoFilled=True,
                                     )
                                 )
                                 continue
 
-                            globExplode = inputs.get("globExplode")
-                        elif inputClass == ContentKind.File.name and inputs.get(
-                            "autoFill", False
-                        ):
-                            # We have to autofill this with the outputs directory,
-                            # so results are properly stored (without escaping the jail)
-                            autoFilledFile = os.path.join(self.outputsDir, path_tokens)
-                            autoFilledDir = os.path.dirname(autoFilledFile)
-                            # This is needed to assure the path exists
-                            if autoFilledDir != self.outputsDir:
-                                os.makedirs(autoFilledDir, exist_ok=True)
-
-                            theInputs.append(
-                                MaterializedInput(
-                                    name=linearKey,
-                                    values=[autoFilledFile],
-                                    autoFilled=True,
-                                )
+                            remote_files: "Optional[Sch_InputURI]" = inputs.get("url")
+                            inline_values: "Optional[Union[str, Sequence[str]]]" = (
+                                inputs.get("value")
                             )
-                            continue
-
-                        remote_files: "Optional[Sch_InputURI]" = inputs.get("url")
-                        inline_values: "Optional[Union[str, Sequence[str]]]" = (
-                            inputs.get("value")
-                        )
-                        # It has to exist
-                        if remote_files is not None or (
-                            inputClass == ContentKind.File.name
-                            and (inline_values is not None)
-                        ):
-                            secondary_remote_files: "Optional[Sch_InputURI]"
-                            if remote_files is not None:
-                                # We are sending the context name thinking in the future,
-                                # as it could contain potential hints for authenticated access
-                                contextName = inputs.get("security-context")
-
-                                secondary_remote_files = inputs.get("secondary-urls")
-                                cacheable = (
-                                    not self.paranoidMode
-                                    if inputs.get("cache", True)
-                                    else False
-                                )
-                                this_ignoreCache = ignoreCache
-                            else:
-                                contextName = None
-                                secondary_remote_files = None
-                                cacheable = False
-                                this_ignoreCache = True
-
-                            preferred_name_conf = inputs.get("preferred-name")
-                            if isinstance(preferred_name_conf, str):
-                                pretty_relname = preferred_name_conf
-                            elif not preferred_name_conf:
-                                # Remove the pre-computed relative dir
-                                pretty_relname = None
-
-                            # Setting up the relative dir preference
-                            reldir_conf = inputs.get("relative-dir")
-                            if isinstance(reldir_conf, str):
-                                relative_dir = reldir_conf
-                            elif not reldir_conf:
-                                # Remove the pre-computed relative dir
-                                relative_dir = None
+                            # It has to exist
+                            if remote_files is not None or (
+                                inputClass == ContentKind.File.name
+                                and (inline_values is not None)
+                            ):
+                                secondary_remote_files: "Optional[Sch_InputURI]"
+                                if remote_files is not None:
+                                    # We are sending the context name thinking in the future,
+                                    # as it could contain potential hints for authenticated access
+                                    contextName = inputs.get("security-context")
+
+                                    secondary_remote_files = inputs.get(
+                                        "secondary-urls"
+                                    )
+                                    cacheable = (
+                                        not self.paranoidMode
+                                        if inputs.get("cache", True)
+                                        else False
+                                    )
+                                    this_ignoreCache = ignoreCache
+                                else:
+                                    contextName = None
+                                    secondary_remote_files = None
+                                    cacheable = False
+                                    this_ignoreCache = True
+
+                                preferred_name_conf = inputs.get("preferred-name")
+                                if isinstance(preferred_name_conf, str):
+                                    pretty_relname = preferred_name_conf
+                                elif not preferred_name_conf:
+                                    # Remove the pre-computed relative dir
+                                    pretty_relname = None
+
+                                # Setting up the relative dir preference
+                                reldir_conf = inputs.get("relative-dir")
+                                if isinstance(reldir_conf, str):
+                                    relative_dir = reldir_conf
+                                elif not reldir_conf:
+                                    # Remove the pre-computed relative dir
+                                    relative_dir = None
+
+                                if relative_dir is not None:
+                                    newInputDestDir = os.path.realpath(
+                                        os.path.join(inputDestDir, relative_dir)
+                                    )
+                                    if newInputDestDir.startswith(
+                                        os.path.realpath(inputDestDir)
+                                    ):
+                                        inputDestDir = cast("AbsPath", newInputDestDir)
 
-                            if relative_dir is not None:
-                                newInputDestDir = os.path.realpath(
-                                    os.path.join(inputDestDir, relative_dir)
+                                # The storage dir depends on whether it can be cached or not
+                                storeDir: "Union[CacheType, AbsPath]" = (
+                                    CacheType.Input
+                                    if cacheable
+                                    else workflowInputs_destdir
                                 )
-                                if newInputDestDir.startswith(
-                                    os.path.realpath(inputDestDir)
-                                ):
-                                    inputDestDir = cast("AbsPath", newInputDestDir)
-
-                            # The storage dir depends on whether it can be cached or not
-                            storeDir: "Union[CacheType, AbsPath]" = (
-                                CacheType.Input if cacheable else workflowInputs_destdir
-                            )
 
-                            remote_files_f: "Sequence[Sch_InputURI_Fetchable]"
-                            if remote_files is not None:
-                                if isinstance(
-                                    remote_files, list
-                                ):  # more than one input file
-                                    remote_files_f = remote_files
-                                else:
-                                    remote_files_f = [
-                                        cast("Sch_InputURI_Fetchable", remote_files)
-                                    ]
-                            else:
-                                inline_values_l: "Sequence[str]"
-                                if isinstance(inline_values, list):
-                                    # more than one inline content
-                                    inline_values_l = inline_values
+                                remote_files_f: "Sequence[Sch_InputURI_Fetchable]"
+                                if remote_files is not None:
+                                    if isinstance(
+                                        remote_files, list
+                                    ):  # more than one input file
+                                        remote_files_f = remote_files
+                                    else:
+                                        remote_files_f = [
+                                            cast("Sch_InputURI_Fetchable", remote_files)
+                                        ]
                                 else:
-                                    inline_values_l = [cast("str", inline_values)]
-
-                                remote_files_f = [
-                                    # The storage dir is always the input
-                                    # Let's use the trick of translating the content into a data URL
-                                    bin2dataurl(inline_value.encode("utf-8"))
-                                    for inline_value in inline_values_l
-                                ]
-
-                            remote_pairs: "MutableSequence[MaterializedContent]" = []
-                            for remote_file in remote_files_f:
-                                lastInput += 1
-                                try:
-                                    t_remote_pairs = self._fetchRemoteFile(
-                                        remote_file,
-                                        contextName,
-                                        offline,
-                                        storeDir,
-                                        cacheable,
-                                        inputDestDir,
-                                        globExplode,
-                                        prefix=str(lastInput) + "_",
-                                        prettyRelname=pretty_relname,
-                                        ignoreCache=this_ignoreCache,
-                                    )
-                                    remote_pairs.extend(t_remote_pairs)
-                                except:
-                                    self.logger.exception(
-                                        f"Error while fetching primary URI {remote_file}"
-                                    )
-                                    the_failed_uris.append(remote_file)
+                                    inline_values_l: "Sequence[str]"
+                                    if isinstance(inline_values, list):
+                                        # more than one inline content
+                                        inline_values_l = inline_values
+                                    else:
+                                        inline_values_l = [cast("str", inline_values)]
 
-                            secondary_remote_pairs: "Optional[MutableSequence[MaterializedContent]]"
-                            if (remote_files is not None) and (
-                                secondary_remote_files is not None
-                            ):
-                                secondary_remote_files_f: "Sequence[Sch_InputURI_Fetchable]"
-                                if isinstance(
-                                    secondary_remote_files, list
-                                ):  # more than one input file
-                                    secondary_remote_files_f = secondary_remote_files
-                                else:
-                                    secondary_remote_files_f = [
-                                        cast(
-                                            "Sch_InputURI_Fetchable",
-                                            secondary_remote_files,
-                                        )
+                                    remote_files_f = [
+                                        # The storage dir is always the input
+                                        # Let's use the trick of translating the content into a data URL
+                                        bin2dataurl(inline_value.encode("utf-8"))
+                                        for inline_value in inline_values_l
                                     ]
 
-                                secondary_remote_pairs = []
-                                for secondary_remote_file in secondary_remote_files_f:
-                                    # The last fetched content prefix is the one used
-                                    # for all the secondaries
+                                remote_pairs: "MutableSequence[MaterializedContent]" = (
+                                    []
+                                )
+                                for remote_file in remote_files_f:
+                                    lastInput += 1
                                     try:
-                                        t_secondary_remote_pairs = (
-                                            self._fetchRemoteFile(
-                                                secondary_remote_file,
-                                                contextName,
-                                                offline,
-                                                storeDir,
-                                                cacheable,
-                                                inputDestDir,
-                                                globExplode,
-                                                prefix=str(lastInput) + "_",
-                                                ignoreCache=ignoreCache,
-                                            )
-                                        )
-                                        secondary_remote_pairs.extend(
-                                            t_secondary_remote_pairs
+                                        t_remote_pairs = self._fetchRemoteFile(
+                                            remote_file,
+                                            contextName,
+                                            offline,
+                                            storeDir,
+                                            cacheable,
+                                            inputDestDir,
+                                            globExplode,
+                                            prefix=str(lastInput) + "_",
+                                            prettyRelname=pretty_relname,
+                                            ignoreCache=this_ignoreCache,
                                         )
+                                        remote_pairs.extend(t_remote_pairs)
                                     except:
                                         self.logger.exception(
-                                            f"Error while fetching secondary URI {secondary_remote_file}"
+                                            f"Error while fetching primary URI {remote_file}"
                                         )
-                                        the_failed_uris.append(secondary_remote_file)
+                                        the_failed_uris.append(remote_file)
 
-                            else:
-                                secondary_remote_pairs = None
+                                secondary_remote_pairs: "Optional[MutableSequence[MaterializedContent]]"
+                                if (remote_files is not None) and (
+                                    secondary_remote_files is not None
+                                ):
+                                    secondary_remote_files_f: "Sequence[Sch_InputURI_Fetchable]"
+                                    if isinstance(
+                                        secondary_remote_files, list
+                                    ):  # more than one input file
+                                        secondary_remote_files_f = (
+                                            secondary_remote_files
+                                        )
+                                    else:
+                                        secondary_remote_files_f = [
+                                            cast(
+                                                "Sch_InputURI_Fetchable",
+                                                secondary_remote_files,
+                                            )
+                                        ]
 
-                            theInputs.append(
-                                MaterializedInput(
-                                    name=linearKey,
-                                    values=remote_pairs,
-                                    secondaryInputs=secondary_remote_pairs,
-                                )
-                            )
-                        else:
-                            if inputClass == ContentKind.File.name:
-                                # Empty input, i.e. empty file
-                                inputDestPath = cast(
-                                    "AbsPath",
-                                    os.path.join(inputDestDir, *linearKey.split(".")),
-                                )
-                                os.makedirs(
-                                    os.path.dirname(inputDestPath), exist_ok=True
+                                    secondary_remote_pairs = []
+                                    for (
+                                        secondary_remote_file
+                                    ) in secondary_remote_files_f:
+                                        # The last fetched content prefix is the one used
+                                        # for all the secondaries
+                                        try:
+                                            t_secondary_remote_pairs = (
+                                                self._fetchRemoteFile(
+                                                    secondary_remote_file,
+                                                    contextName,
+                                                    offline,
+                                                    storeDir,
+                                                    cacheable,
+                                                    inputDestDir,
+                                                    globExplode,
+                                                    prefix=str(lastInput) + "_",
+                                                    ignoreCache=ignoreCache,
+                                                )
+                                            )
+                                            secondary_remote_pairs.extend(
+                                                t_secondary_remote_pairs
+                                            )
+                                        except:
+                                            self.logger.exception(
+                                                f"Error while fetching secondary URI {secondary_remote_file}"
+                                            )
+                                            the_failed_uris.append(
+                                                secondary_remote_file
+                                            )
+
+                                else:
+                                    secondary_remote_pairs = None
+
+                                theInputs.append(
+                                    MaterializedInput(
+                                        name=linearKey,
+                                        values=remote_pairs,
+                                        secondaryInputs=secondary_remote_pairs,
+                                    )
                                 )
-                                # Creating the empty file
-                                with open(inputDestPath, mode="wb") as idH:
-                                    pass
-                                contentKind = ContentKind.File
                             else:
-                                inputDestPath = inputDestDir
-                                contentKind = ContentKind.Directory
+                                if inputClass == ContentKind.File.name:
+                                    # Empty input, i.e. empty file
+                                    inputDestPath = cast(
+                                        "AbsPath",
+                                        os.path.join(
+                                            inputDestDir, *linearKey.split(".")
+                                        ),
+                                    )
+                                    os.makedirs(
+                                        os.path.dirname(inputDestPath), exist_ok=True
+                                    )
+                                    # Creating the empty file
+                                    with open(inputDestPath, mode="wb") as idH:
+                                        pass
+                                    contentKind = ContentKind.File
+                                else:
+                                    inputDestPath = inputDestDir
+                                    contentKind = ContentKind.Directory
 
+                                theInputs.append(
+                                    MaterializedInput(
+                                        name=linearKey,
+                                        values=[
+                                            MaterializedContent(
+                                                local=inputDestPath,
+                                                licensed_uri=LicensedURI(
+                                                    uri=cast("URIType", "data:,")
+                                                ),
+                                                prettyFilename=cast(
+                                                    "RelPath",
+                                                    os.path.basename(inputDestPath),
+                                                ),
+                                                kind=contentKind,
+                                            )
+                                        ],
+                                    )
+                                )
+
+                        elif inputClass == ContentKind.ContentWithURIs.name:
+                            (
+                                theNewInputs,
+                                lastInput,
+                                new_failed_uris,
+                            ) = self._fetchContentWithURIs(
+                                inputs,
+                                linearKey,
+                                workflowInputs_destdir,
+                                workflowExtrapolatedInputs_destdir,
+                                lastInput=lastInput,
+                                offline=offline,
+                                ignoreCache=ignoreCache,
+                            )
+                            theInputs.extend(theNewInputs)
+                            the_failed_uris.extend(new_failed_uris)
+                        elif inputClass == ContentKind.Value.name:
+                            input_val = inputs.get("value")
+                            if input_val is None:
+                                raise WFException(f"Value {linearKey} cannot be null")
+
+                            if not isinstance(input_val, list):
+                                input_val = [input_val]
                             theInputs.append(
                                 MaterializedInput(
                                     name=linearKey,
-                                    values=[
-                                        MaterializedContent(
-                                            local=inputDestPath,
-                                            licensed_uri=LicensedURI(
-                                                uri=cast("URIType", "data:,")
-                                            ),
-                                            prettyFilename=cast(
-                                                "RelPath",
-                                                os.path.basename(inputDestPath),
-                                            ),
-                                            kind=contentKind,
-                                        )
-                                    ],
+                                    values=input_val,
                                 )
                             )
-
-                    elif inputClass == ContentKind.ContentWithURIs.name:
-                        (
-                            theNewInputs,
-                            lastInput,
-                            new_failed_uris,
-                        ) = self._fetchContentWithURIs(
-                            inputs,
-                            linearKey,
-                            workflowInputs_destdir,
-                            workflowExtrapolatedInputs_destdir,
-                            lastInput=lastInput,
-                            offline=offline,
-                            ignoreCache=ignoreCache,
-                        )
-                        theInputs.extend(theNewInputs)
-                        the_failed_uris.extend(new_failed_uris)
-                    elif inputClass == ContentKind.Value.name:
-                        input_val = inputs.get("value")
-                        if input_val is None:
-                            raise WFException(f"Value {linearKey} cannot be null")
-
-                        if not isinstance(input_val, list):
-                            input_val = [input_val]
-                        theInputs.append(
-                            MaterializedInput(
-                                name=linearKey,
-                                values=input_val,
+                        else:
+                            raise WFException(
+                                'Unrecognized input class "{}", attached to "{}"'.format(
+                                    inputClass, linearKey
+                                )
                             )
-                        )
                     else:
-                        raise WFException(
-                            'Unrecognized input class "{}", attached to "{}"'.format(
-                                inputClass, linearKey
-                            )
-                        )
+                        # possible nested files, which are visited
+                        # before the pending siblings
+                        paramsIterStack.append((linearKey + ".", iter(inputs.items())))
+                        break
                 else:
-                    # possible nested files
-                    newInputsAndParams, lastInput, new_failed_uris = self.fetchInputs(
-                        inputs,
-                        workflowInputs_destdir=workflowInputs_destdir,
-                        workflowExtrapolatedInputs_destdir=workflowExtrapolatedInputs_destdir,
-                        prefix=linearKey + ".",
-                        lastInput=lastInput,
-                        offline=offline,
-                        ignoreCache=ignoreCache,
+                    if not isinstance(inputs, list):
+                        inputs = [inputs]
+                    theInputs.append(
+                        MaterializedInput(
+                            name=linearKey,
+                            values=inputs,
+                        )
                     )
-                    theInputs.extend(newInputsAndParams)
-                    the_failed_uris.extend(new_failed_uris)
             else:
-                if not isinstance(inputs, list):
-                    inputs = [inputs]
-                theInputs.append(
-                    MaterializedInput(
-                        name=linearKey,
-                        values=inputs,
-                    )
-                )
+                # This level has been completely visited
+                paramsIterStack.pop()
 
         return theInputs, lastInput, the_failed_uris
 
@@ -3087,17 +3285,21 @@ class WF:
             workflow_meta_filename = os.path.join(
                 self.metaDir, WORKDIR_WORKFLOW_META_FILE
             )
-            if (
-                overwrite
-                or not os.path.exists(workflow_meta_filename)
-                or os.path.getsize(workflow_meta_filename) == 0
-            ):
+            meta_stat: "Optional[os.stat_result]" = None
+            if not overwrite:
+                try:
+                    meta_stat = os.stat(workflow_meta_filename)
+                except FileNotFoundError:
+                    pass
+
+            if meta_stat is None or meta_stat.st_size == 0:
                 staging_recipe = self.staging_recipe
                 with open(workflow_meta_filename, mode="w", encoding="utf-8") as wmF:
                     yaml.dump(staging_recipe, wmF, Dumper=YAMLDumper)
+                meta_stat = os.stat(workflow_meta_filename)
 
             self.configMarshalled = datetime.datetime.fromtimestamp(
-                os.path.getctime(workflow_meta_filename), tz=datetime.timezone.utc
+                meta_stat.st_ctime, tz=datetime.timezone.utc
             )
 
         return self.configMarshalled